@@ -1,15 +1,32 @@
 import base64
+import contextlib
+import errno
 import filecmp
 import hashlib
 import logging
 import os
 import shutil
 import subprocess
+import tempfile
 from collections.abc import Callable
 from pathlib import Path
 
+try:
+    import magic
+except ImportError:
+    magic = None
+
 logger = logging.getLogger(__name__)
 
+# Shared libmagic handle, opened on first use (python-magic serialises calls on it)
+_magic = None
+
+# How much of an upcoming file prefetch_file() asks the kernel to read
+PREFETCH_BYTES = 64 * 1024 * 1024
+
+# Fallback command used when python-magic isn't installed
+FILE_MIME_TYPE_COMMAND = ("/usr/bin/file", "--mime-type", "--brief")
+
 
 def read_in_chunks(file_object, chunk_size=65536):
     """Lazy function (generator) to read a file piece by piece.
@@ -21,25 +38,48 @@ def read_in_chunks(file_object, chunk_size=65536):
         yield data
 
 
-def analyze_file(filepath, hash_progress_callback: Callable[[int, int], None] | None = None):
+def analyze_file(
+    filepath,
+    hash_progress_callback: Callable[[int, int], None] | None = None,
+    mime_type: str | None = None,
+    mime_type_callback: Callable[[str], None] | None = None,
+):
     """
     Analyze a file to extract hash, MIME type, and size information.
 
+    The file is read once: the size comes from the hashing pass, and the MIME
+    type is sniffed from the first chunk it read.
+
     Args:
         filepath: Path to the file to analyze
         hash_progress_callback: Optional callback(bytes_processed, total_bytes) for progress updates
+        mime_type: MIME type if the caller already detected it, skips sniffing
+        mime_type_callback: Optional callback(mime_type), called as soon as the
+                            MIME type is known rather than once the whole file
+                            has been hashed
 
     Returns:
         Dictionary containing sha1, sha512, mime_type, and size
     """
-    path = Path(filepath)
-    results = hash_file(filepath, progress_callback=hash_progress_callback)
-    results["mime_type"] = get_mime_type(filepath)
-    results["size"] = path.stat().st_size
+
+    def sniff_mime_type(header):
+        nonlocal mime_type
+        mime_type = get_mime_type(filepath, header=header)
+        if mime_type_callback:
+            mime_type_callback(mime_type)
+
+    if mime_type is not None and mime_type_callback:
+        mime_type_callback(mime_type)
+
+    results, size = _hash_file(
+        filepath, hash_progress_callback, header_callback=sniff_mime_type if mime_type is None else None
+    )
+    results["mime_type"] = mime_type
+    results["size"] = size
     return results
 
 
-def hash_file(filepath, progress_callback: Callable[[int, int], None] | None = None, chunk_size: int = 65536):
+def hash_file(filepath, progress_callback: Callable[[int, int], None] | None = None, chunk_size: int = 1024 * 1024):
     """
     Calculate SHA1 and SHA512 hashes for a file.
 
@@ -49,7 +89,7 @@ def hash_file(filepath, progress_callback: Callable[[int, int], None] | None = N
                           Note: Any exceptions raised by the callback will propagate and stop the
                           hashing process. This allows callers to implement their own error handling
                           or cancellation logic.
-        chunk_size: Size of chunks to read (default 64KB for better performance with large files)
+        chunk_size: Size of the read buffer (default 1MB, reused for every read)
 
     Returns:
         Dictionary containing sha1 and sha512 hashes (base32 encoded, padding stripped)
@@ -57,34 +97,132 @@ def hash_file(filepath, progress_callback: Callable[[int, int], None] | None = N
     Raises:
         Any exceptions from the progress_callback will propagate to the caller
     """
+    results, _size = _hash_file(filepath, progress_callback, chunk_size)
+    return results
+
+
+def _hash_file(
+    filepath,
+    progress_callback: Callable[[int, int], None] | None = None,
+    chunk_size: int = 1024 * 1024,
+    header_callback: Callable[[bytes], None] | None = None,
+) -> tuple[dict[str, str], int]:
+    """
+    Hash a file in a single pass.
+
+    header_callback, if given, is called with the first chunk as soon as it
+    has been read (b"" for an empty file).
+
+    Returns:
+        Tuple of (hashes dict as returned by hash_file, bytes read)
+    """
     sha1 = hashlib.sha1()
     sha512 = hashlib.sha512()
-
-    # Get file size for progress reporting
-    file_size = os.path.getsize(filepath)
     bytes_processed = 0
 
-    with open(filepath, "rb") as f:
-        for piece in read_in_chunks(f, chunk_size):
+    with open(filepath, "rb", buffering=0) as f:
+        # Get file size for progress reporting
+        file_size = os.fstat(f.fileno()).st_size
+
+        for piece in _read_chunks(f, chunk_size):
+            if header_callback and not bytes_processed:
+                header_callback(bytes(piece))
             sha1.update(piece)
             sha512.update(piece)
+            bytes_processed += len(piece)
 
             # Update progress if callback provided
             # Note: Exceptions from callback will propagate (intentional for cancellation support)
             if progress_callback:
-                bytes_processed += len(piece)
                 progress_callback(bytes_processed, file_size)
 
-    return {
+    if header_callback and not bytes_processed:
+        header_callback(b"")
+
+    hashes = {
         "sha1": str(base64.b32encode(sha1.digest()), "ascii").rstrip("="),
         "sha512": str(base64.b32encode(sha512.digest()), "ascii").rstrip("="),
     }
+    return hashes, bytes_processed
 
 
-def get_mime_type(filepath):
+def _read_chunks(f, chunk_size: int):
+    """
+    Yield memoryviews over successive chunks of an open binary file.
+
+    The file is read rather than mmap()ed: files being imported may still be
+    written to, and touching an mmap()ed page past the end of a file that was
+    truncated meanwhile kills the process with SIGBUS. A truncated file just
+    ends early here.
+    """
+    if hasattr(os, "posix_fadvise"):
+        # Let the kernel read ahead more aggressively
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    # Read into one buffer instead of allocating a new bytes object per chunk
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        yield view[:n]
+
+
+def prefetch_file(filepath, length: int = PREFETCH_BYTES) -> None:
+    """
+    Ask the kernel to start reading the start of a file into the page cache.
+
+    Returns immediately; the read happens in the background, so a file that
+    is about to be hashed can be fetched while the current one is. Only the
+    first length bytes are requested, so a huge file doesn't push everything
+    else out of the page cache; sequential readahead takes over from there.
+    Does nothing where posix_fadvise isn't available or the file can't be
+    opened.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(filepath, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _get_magic():
+    global _magic
+    if _magic is None:
+        _magic = magic.Magic(mime=True)
+    return _magic
+
+
+def get_mime_type(filepath, header: bytes | None = None):
+    """
+    Detect the MIME type of a file.
+
+    Args:
+        filepath: Path to the file
+        header: Optional leading bytes of the file, already read by the caller.
+                With python-magic installed these are sniffed instead of reading
+                the file again, unless the file is empty.
+    """
+    # Ask libmagic in-process when python-magic is installed, which saves
+    # spawning `file` for every imported file
+    if magic is not None:
+        try:
+            # An empty buffer sniffs as application/x-empty, while `file` and
+            # from_file() say inode/x-empty, so only sniff non-empty headers
+            if header:
+                return _get_magic().from_buffer(header)
+            return _get_magic().from_file(str(filepath))
+        except magic.MagicException as e:
+            logger.debug(f"libmagic failed for {filepath!r}, falling back to 'file': {e}")
+
     try:
         result = subprocess.run(
-            ["/usr/bin/file", "--mime-type", "--brief", filepath],
+            [*FILE_MIME_TYPE_COMMAND, filepath],
             capture_output=True,
             text=True,
             timeout=10,
@@ -138,7 +276,56 @@ def smartcopy(src, dst):
         assert same_contents(src, dst), f"These two files should be the same, but are not {src!r} vs {dst!r}"
         return False
     dst_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst)
+
+    # Copy under a temporary name and then link it into place, so a concurrent
+    # import of the same content never sees (or truncates) a half-written dst
+    fd, tmp = tempfile.mkstemp(dir=dst_path.parent, prefix=f".{dst_path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if not _copy_file_range(src, tmp):
+            shutil.copy2(src, tmp)
+        try:
+            os.link(tmp, dst)
+        except FileExistsError:
+            # Another import of the same content got there first
+            assert same_contents(src, dst), f"These two files should be the same, but are not {src!r} vs {dst!r}"
+            return False
+        except OSError:
+            # No hard links on this filesystem, a rename is still atomic
+            os.replace(tmp, dst)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+    return True
+
+
+def _copy_file_range(src, dst):
+    """
+    Copy src to dst with copy_file_range(2), preserving metadata like copy2.
+
+    The kernel does the copy without passing data through userspace, and can
+    reflink on CoW filesystems or copy server-side on NFS. Returns False when
+    the platform or filesystem doesn't support it so the caller can fall back.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        copied = 0
+        try:
+            # Copy up to 1 GiB per call until the kernel reports end of file
+            while n := os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                copied += n
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL) and copied == 0:
+                return False
+            raise
+        if copied == 0:
+            # procfs/sysfs-style files report no data to copy_file_range even
+            # when reading them returns some, so read them the ordinary way
+            shutil.copyfileobj(fsrc, fdst)
+
+    shutil.copystat(src, dst)
     return True
 
 
@@ -179,7 +366,12 @@ def smartlink(src, dst):
         src_path.hardlink_to(dst_path)
         return
     dst_path.parent.mkdir(parents=True, exist_ok=True)
-    dst_path.hardlink_to(src_path)
+    try:
+        dst_path.hardlink_to(src_path)
+    except FileExistsError:
+        # Another import of the same content placed dst since the exists()
+        # check above, so link src to it like any other duplicate
+        return smartlink(src, dst)
 
 
 class CannotHardLinkError(Exception):
@@ -28,6 +28,20 @@ class Command(BaseCommand):
             help="Show progress bar for file hashing",
         )
 
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of files to import concurrently from directories (default: 1)",
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Index files from directories in batches of this size, one transaction per batch",
+        )
+
     def setup_logger(self, options):
         verbosity = int(options["verbosity"])
         root_logger = logging.getLogger("")
@@ -38,6 +52,7 @@ class Command(BaseCommand):
         self.setup_logger(options)
         only_hard_link = options["only_hard_links"]
         show_hash_progress = options["show_hash_progress"]
+        workers = options["workers"]
         total_stats = {
             "imported": 0,
             "created": 0,
@@ -63,8 +78,9 @@ class Command(BaseCommand):
                         desc="Hashing",
                         leave=False,
                     )
-                hash_pbar.n = bytes_processed
-                hash_pbar.refresh()
+                # update() only redraws every mininterval, unlike refresh() which
+                # would re-render the bar for every chunk hashed
+                hash_pbar.update(bytes_processed - hash_pbar.n)
 
         for path in options["paths"]:
             if os.path.isfile(path):
@@ -111,7 +127,10 @@ class Command(BaseCommand):
                     only_hard_link=only_hard_link,
                     validate=True,
                     progress_callback=progress_callback,
-                    hash_progress_callback=hash_progress_callback,
+                    # A single hash progress bar can't follow several files at once
+                    hash_progress_callback=hash_progress_callback if workers <= 1 else None,
+                    max_workers=workers,
+                    batch_size=options["batch_size"],
                 )
 
                 # Merge stats
@@ -4,7 +4,10 @@ backups/fileindex.
 Orphaned files are those present in the filesystem but not tracked in the database.
 """
 
+import errno
+import os
 import shutil
+import stat
 from pathlib import Path
 
 from django.conf import settings
@@ -67,9 +70,11 @@ class Command(BaseCommand):
         """Get set of all file paths tracked in the database"""
         tracked_paths = set()
 
-        for indexed_file in IndexedFile.objects.all():
+        # Only the stored file name is needed, so skip building model instances
+        file_names = IndexedFile.objects.values_list("file", flat=True).iterator(chunk_size=5000)
+        for file_name in file_names:
             # Store the relative path from media root
-            tracked_paths.add(self.media_root / indexed_file.file.name)
+            tracked_paths.add(self.media_root / file_name)
 
         return tracked_paths
 
@@ -81,16 +86,26 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"Directory does not exist: {self.fileindex_dir}"))
             return orphaned_files
 
-        # Walk through all files in fileindex directory
-        all_files = list(self.fileindex_dir.rglob("*"))
-
-        for file_path in all_files:
-            if file_path.is_file() and file_path not in tracked_paths:
+        # Walk through all files in fileindex directory. os.walk gets the file
+        # type from the directory listing, so only untracked entries need a stat
+        for dirpath, _dirnames, filenames in os.walk(self.fileindex_dir):
+            parent = Path(dirpath)
+            for filename in filenames:
+                file_path = parent / filename
+                if file_path in tracked_paths:
+                    continue
+                # The walk also lists sockets, FIFOs and broken symlinks; only
+                # regular files are orphans
+                try:
+                    if not stat.S_ISREG(os.lstat(file_path).st_mode):
+                        continue
+                except OSError:
+                    continue
                 orphaned_files.append(file_path)
 
                 if self.limit and len(orphaned_files) >= self.limit:
                     self.stdout.write(self.style.WARNING(f"Limiting to {self.limit} files"))
-                    break
+                    return orphaned_files
 
         return orphaned_files
 
@@ -130,12 +145,15 @@ class Command(BaseCommand):
         # Create backup directory structure if needed
         backup_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Move the file
-        shutil.move(str(file_path), str(backup_path))
-
-        # Verify move was successful
-        if not backup_path.exists():
-            raise FileNotFoundError(f"File not found after move: {backup_path}")
+        # Move the file; rename() either succeeds or raises, so there is no
+        # need to stat the destination afterwards
+        try:
+            os.rename(file_path, backup_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Backups live on another filesystem, fall back to copy + delete
+            shutil.move(str(file_path), str(backup_path))
 
         # Remove empty directories in source
         try:
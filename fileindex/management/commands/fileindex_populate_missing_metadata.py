@@ -1,10 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.db.models import Q
 from tqdm import tqdm
 
 from fileindex.models import IndexedFile
 from fileindex.services import metadata
 
+# Number of changed rows written per UPDATE statement
+BATCH_SIZE = 500
+
 
 class Command(BaseCommand):
     help = "Populate JSON metadata only for IndexedFiles without existing metadata"
@@ -30,12 +37,19 @@ class Command(BaseCommand):
             type=str,
             help="Only process files with this MIME type (e.g., video/quicktime)",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of files to extract metadata from in parallel (default: 1)",
+        )
 
     def handle(self, *args, **options):
         dry_run = options.get("dry_run", False)
         force_update = options.get("force_update", False)
         migrate_structure = options.get("migrate_structure", False)
         mime_type = options.get("mime_type")
+        workers = max(1, options.get("workers") or 1)
 
         if dry_run:
             self.stdout.write("DRY RUN MODE - No changes will be made\n")
@@ -72,11 +86,18 @@ class Command(BaseCommand):
             return
 
         updated_count = 0
+        corrupt_batch = []
+        metadata_batch = []
+
+        # Only load the columns the loop reads, and stream rows instead of
+        # caching the whole result set
+        rows = indexed_files.only("id", "sha512", "mime_type", "file", "metadata").iterator(chunk_size=BATCH_SIZE)
 
-        for indexed_file in tqdm(indexed_files, desc="Processing IndexedFiles"):
+        extracted = self._extract_metadata(rows, workers)
+
+        for indexed_file, future in tqdm(extracted, total=total_count, desc="Processing IndexedFiles"):
             try:
-                # Extract metadata using the unified metadata service
-                new_metadata, is_corrupt = metadata.extract_metadata(indexed_file.file.path, indexed_file.mime_type)
+                new_metadata, is_corrupt = future.result()
 
                 # Handle corrupt files with more specific context
                 if is_corrupt:
@@ -92,14 +113,14 @@ class Command(BaseCommand):
                     self.stdout.write(error_msg)
                     if not dry_run:
                         indexed_file.corrupt = True
-                        indexed_file.save(update_fields=["corrupt"])
+                        corrupt_batch.append(indexed_file)
                     continue
 
                 # Check if we have new metadata to save
                 if new_metadata and (force_update or indexed_file.metadata != new_metadata):
                     if not dry_run:
                         indexed_file.metadata = new_metadata
-                        indexed_file.save(update_fields=["metadata"])
+                        metadata_batch.append(indexed_file)
                     updated_count += 1
 
                     if dry_run:
@@ -111,6 +132,15 @@ class Command(BaseCommand):
                 self.stdout.write(f"Error processing {indexed_file.sha512[:10]} ({file_type}): {error_type}: {e}")
                 continue
 
+            # Outside the try above, so a failed write is never blamed on this row
+            if len(corrupt_batch) >= BATCH_SIZE:
+                self._flush(corrupt_batch, "corrupt")
+            if len(metadata_batch) >= BATCH_SIZE:
+                updated_count -= self._flush(metadata_batch, "metadata")
+
+        self._flush(corrupt_batch, "corrupt")
+        updated_count -= self._flush(metadata_batch, "metadata")
+
         if dry_run:
             self.stdout.write(
                 self.style.SUCCESS(f"\nDRY RUN: Would populate metadata for {updated_count} IndexedFiles")
@@ -120,6 +150,58 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"\n✓ Successfully populated metadata for {updated_count} IndexedFiles")
             )
 
+    def _extract_metadata(self, indexed_files, workers: int):
+        """
+        Extract metadata for each file on a thread pool.
+
+        Extraction is mostly spent waiting on ffprobe/mediainfo subprocesses and
+        file reads, so threads overlap well. Files are submitted a batch at a
+        time to keep memory bounded; database writes stay on the calling thread.
+
+        Yields:
+            (indexed_file, future) pairs in input order, where the future resolves
+            to extract_metadata()'s (metadata, is_corrupt) result
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batched(indexed_files, BATCH_SIZE):
+                futures = [executor.submit(self._extract_one, indexed_file) for indexed_file in batch]
+                yield from zip(batch, futures, strict=True)
+
+    @staticmethod
+    def _extract_one(indexed_file: IndexedFile):
+        # Extract metadata using the unified metadata service
+        return metadata.extract_metadata(indexed_file.file.path, indexed_file.mime_type)
+
+    def _flush(self, batch: list[IndexedFile], field: str) -> int:
+        """
+        Write a batch of changed IndexedFiles with one bulk UPDATE and empty the batch.
+
+        If the bulk UPDATE fails, each row is saved on its own so one bad row
+        doesn't lose the rest of the batch.
+
+        Returns:
+            Number of rows that couldn't be saved
+        """
+        if not batch:
+            return 0
+
+        failed = 0
+        try:
+            with transaction.atomic():
+                IndexedFile.objects.bulk_update(batch, [field])
+        except Exception:
+            for indexed_file in batch:
+                try:
+                    indexed_file.save(update_fields=[field])
+                except Exception as e:
+                    failed += 1
+                    file_type = indexed_file.mime_type or "unknown"
+                    error_type = type(e).__name__
+                    self.stdout.write(f"Error saving {indexed_file.sha512[:10]} ({file_type}): {error_type}: {e}")
+        finally:
+            batch.clear()
+        return failed
+
     def _migrate_metadata_structure(self, dry_run: bool) -> None:
         """Migrate old flat metadata structure to new nested structure."""
         self.stdout.write("Migrating metadata to new structure...\n")
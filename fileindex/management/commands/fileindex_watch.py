@@ -3,7 +3,6 @@ import os
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from watchdog.events import LoggingEventHandler
 
 from fileindex.services.watch import DirectoryWatcher
 
@@ -76,14 +75,6 @@ class Command(BaseCommand):
         for path in options["paths"]:
             self.stdout.write(f"  • {path}")
 
-        # Add verbose logging if requested
-        if verbosity > 1:
-            observer = watcher.start_watching()
-            # Add logging event handler for verbose output
-            event_handler = LoggingEventHandler()
-            for path in options["paths"]:
-                observer.schedule(event_handler, path, recursive=True)
-
         # Start watching and wait
         try:
             watcher.watch_and_wait()
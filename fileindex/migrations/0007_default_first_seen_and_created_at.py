@@ -0,0 +1,23 @@
+# Generated by Django 6.0.9 on 2026-10-16 17:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fileindex", "0006_indexedfile_fileindex_i_derived_136784_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="filepath",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name="indexedfile",
+            name="first_seen",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,10 +1,13 @@
 import datetime
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
 from typing import Any, NotRequired, TypedDict
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.dispatch import Signal
 from django.utils import timezone
 
@@ -12,8 +15,6 @@ from fileindex import fileutils
 
 logger = logging.getLogger(__name__)
 
-local_tz = timezone.get_current_timezone()
-
 
 # TypedDict definitions for metadata structure
 class BaseMetadata(TypedDict):
@@ -117,17 +118,42 @@ FileMetadata = ImageMetadata | VideoMetadata | AudioMetadata | BaseMetadata
 
 indexedfile_added = Signal()
 
+# Runs metadata extraction alongside hashing for get_or_create_with_filepath_nfo(),
+# shared so a thread pool isn't set up and torn down for every file
+_metadata_executor = ThreadPoolExecutor(thread_name_prefix="fileindex-metadata")
+
 
-def filepath_nfo_from_file(filepath):
+def filepath_nfo_from_file(filepath, stat=None):
     path = Path(filepath).resolve()
     ret = {"path": str(path)}
-    stat = path.stat()
-    ret["mtime"] = datetime.datetime.fromtimestamp(stat.st_mtime, local_tz)
-    ret["ctime"] = datetime.datetime.fromtimestamp(stat.st_ctime, local_tz)
+    if stat is None:
+        stat = path.stat()
+    ret["mtime"] = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.UTC)
+    ret["ctime"] = datetime.datetime.fromtimestamp(stat.st_ctime, datetime.UTC)
     return ret
 
 
-class IndexedFileManager(models.Manager):
+class IndexedFileQuerySet(models.QuerySet):
+    def with_display_data(self):
+        """
+        Prefetch what the filename and thumbnail properties read, so listing
+        many files doesn't cost two extra queries per row.
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                "filepath_set",
+                queryset=FilePath.objects.only("id", "indexedfile", "path").order_by("pk"),
+                to_attr="_prefetched_filepaths",
+            ),
+            models.Prefetch(
+                "derived_files",
+                queryset=IndexedFile.objects.filter(derived_for="thumbnail").order_by("pk"),
+                to_attr="_prefetched_thumbnails",
+            ),
+        )
+
+
+class IndexedFileManager(models.Manager.from_queryset(IndexedFileQuerySet)):
     def get_or_create_with_filepath_nfo(
         self,
         filepath,
@@ -135,30 +161,51 @@ class IndexedFileManager(models.Manager):
         derived_from=None,
         derived_for=None,
         hash_progress_callback=None,
+        stat=None,
         **filepath_kwargs,
     ):
-        nfo = fileutils.analyze_file(filepath, hash_progress_callback=hash_progress_callback)
+        from fileindex.services.metadata import extract_metadata
+
+        # Hashing and metadata extraction (ffprobe/mediainfo subprocesses) are
+        # independent, so extraction starts as soon as the MIME type has been
+        # sniffed from the first chunk hashed and runs alongside the rest of
+        # the hashing. Hashing stays on this thread so progress callbacks do too.
+        metadata_future = None
+
+        def start_metadata_extraction(mime_type):
+            nonlocal metadata_future
+            metadata_future = _metadata_executor.submit(extract_metadata, str(filepath), mime_type, stat=stat)
+
+        try:
+            nfo = fileutils.analyze_file(
+                filepath, hash_progress_callback=hash_progress_callback, mime_type_callback=start_metadata_extraction
+            )
+        except BaseException:
+            # e.g. cancelled from the progress callback, don't wait on ffprobe
+            if metadata_future is not None:
+                metadata_future.cancel()
+            raise
+        metadata, is_corrupt = metadata_future.result()
+
+        # The storage path only depends on the hash, so new rows get it at
+        # INSERT time instead of needing a follow-up UPDATE
+        storage_path = IndexedFile.storage_path_for(nfo["sha512"])
 
         # Use SHA-512 as the lookup field (should be unique)
         # Everything else goes in defaults so they're only used for creation
         defaults = {
+            "file": storage_path,
             "sha1": nfo["sha1"],
             "mime_type": nfo["mime_type"],
             "size": nfo["size"],
             "derived_from": derived_from,
-            "first_seen": datetime.datetime.now(local_tz),
         }
 
         # Add derived_for if specified
         if derived_for is not None:
             defaults["derived_for"] = derived_for
 
-        # Extract metadata BEFORE creating the object to satisfy constraints
-        from fileindex.services.metadata import extract_metadata
-
-        metadata, is_corrupt = extract_metadata(str(filepath), nfo["mime_type"])
-
-        # Add the extracted metadata to defaults
+        # Metadata was extracted BEFORE creating the object to satisfy constraints
         if metadata:
             defaults["metadata"] = metadata
 
@@ -177,24 +224,25 @@ class IndexedFileManager(models.Manager):
             defaults={
                 "mtime": filepath_kwargs["mtime"],
                 "ctime": filepath_kwargs["ctime"],
-                "created_at": datetime.datetime.now(local_tz),
             },
         )
         # Ensure MEDIA_ROOT is absolute to prevent files being created in wrong location
         media_root = Path(settings.MEDIA_ROOT).resolve()
-        dest_path = media_root / indexedfile.path
+        dest_path = media_root / storage_path
 
         fileutils.smartadd(
             filepath,
             str(dest_path),
             only_hard_link=only_hard_link,
         )
-        indexedfile.file.name = indexedfile.path
 
         # Metadata was already extracted before get_or_create for new files
         # No need to extract again
 
-        indexedfile.save()
+        # Existing rows may still point at an older storage layout
+        if indexedfile.file.name != storage_path:
+            indexedfile.file.name = storage_path
+            indexedfile.save(update_fields=["file"])
 
         # Only send signal after successful save with all metadata present
         # This ensures signal handlers have access to complete metadata
@@ -206,16 +254,161 @@ class IndexedFileManager(models.Manager):
     def get_or_create_from_file(
         self, filepath, only_hard_link=False, derived_from=None, derived_for=None, hash_progress_callback=None
     ):
-        fp_nfo = filepath_nfo_from_file(str(filepath))
+        # stat() once and share it between the FilePath times and ffprobe's cache key
+        stat = os.stat(filepath)
+        fp_nfo = filepath_nfo_from_file(str(filepath), stat=stat)
         return self.get_or_create_with_filepath_nfo(
             filepath,
             only_hard_link=only_hard_link,
             derived_from=derived_from,
             derived_for=derived_for,
             hash_progress_callback=hash_progress_callback,
+            stat=stat,
             **fp_nfo,
         )
 
+    def get_or_create_from_files(self, filepaths, only_hard_link=False, max_workers=4):
+        """
+        Index several files at once.
+
+        Hashing and metadata extraction run on a thread pool, then the new
+        IndexedFile and FilePath rows are written with one bulk_create each
+        instead of two get_or_create() round trips per file. Files are placed
+        in storage before any rows are written, so if placing one fails the
+        database is left untouched and the batch can be retried.
+
+        Like get_or_create_with_filepath_nfo(), existing rows still pointing at
+        an older storage layout are moved to the current one, and
+        indexedfile_added is sent once for each new file. Unlike it, the
+        signals are sent with send_robust() once the whole batch is written: a
+        receiver that raises is logged instead of failing the call, so the
+        rest of the batch still gets its signals.
+
+        Returns:
+            List of (indexedfile, created) tuples in the same order as filepaths
+        """
+        from fileindex.services.metadata import extract_metadata
+
+        filepaths = [str(filepath) for filepath in filepaths]
+
+        def analyze(filepath):
+            stat = os.stat(filepath)
+            nfo = fileutils.analyze_file(filepath)
+            metadata, is_corrupt = extract_metadata(filepath, nfo["mime_type"], stat=stat)
+            return nfo, metadata, is_corrupt, filepath_nfo_from_file(filepath, stat=stat)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            analyzed = list(executor.map(analyze, filepaths))
+
+        # Place every file before writing any rows, so a failure here (e.g.
+        # CannotHardLinkError) can't leave rows behind without a stored file.
+        # smartadd() is idempotent, so the whole batch can safely be retried.
+        # Ensure MEDIA_ROOT is absolute to prevent files being created in wrong location
+        media_root = Path(settings.MEDIA_ROOT).resolve()
+        for filepath, (nfo, _metadata, _is_corrupt, _fp_nfo) in zip(filepaths, analyzed, strict=True):
+            storage_path = IndexedFile.storage_path_for(nfo["sha512"])
+            fileutils.smartadd(filepath, str(media_root / storage_path), only_hard_link=only_hard_link)
+
+        hashes = {nfo["sha512"] for nfo, _metadata, _is_corrupt, _fp_nfo in analyzed}
+        existing = self.in_bulk(hashes, field_name="sha512")
+
+        new_files = {}
+        for nfo, metadata, is_corrupt, _fp_nfo in analyzed:
+            sha512 = nfo["sha512"]
+            if sha512 in existing or sha512 in new_files:
+                continue
+            new_files[sha512] = {
+                "sha1": nfo["sha1"],
+                "mime_type": nfo["mime_type"],
+                "size": nfo["size"],
+                "file": IndexedFile.storage_path_for(sha512),
+                "metadata": metadata or {},
+                "corrupt": True if is_corrupt else None,
+            }
+
+        with transaction.atomic():
+            inserted = self._insert_new_files(new_files)
+            indexedfiles = self.in_bulk(hashes, field_name="sha512")
+
+            # One query for the FilePaths that already exist, rather than one per file
+            known_paths = set(
+                FilePath.objects.filter(
+                    indexedfile__in=indexedfiles.values(),
+                    path__in=[fp_nfo["path"] for _nfo, _metadata, _is_corrupt, fp_nfo in analyzed],
+                ).values_list("indexedfile_id", "path")
+            )
+
+            new_paths = []
+            for nfo, _metadata, _is_corrupt, fp_nfo in analyzed:
+                key = (indexedfiles[nfo["sha512"]].pk, fp_nfo["path"])
+                if key in known_paths:
+                    continue
+                known_paths.add(key)
+                new_paths.append(
+                    FilePath(
+                        indexedfile_id=key[0],
+                        path=fp_nfo["path"],
+                        mtime=fp_nfo["mtime"],
+                        ctime=fp_nfo["ctime"],
+                    )
+                )
+            FilePath.objects.bulk_create(new_paths, ignore_conflicts=True, batch_size=500)
+
+            # Existing rows may still point at an older storage layout
+            for sha512, indexedfile in indexedfiles.items():
+                storage_path = IndexedFile.storage_path_for(sha512)
+                if indexedfile.file.name != storage_path:
+                    indexedfile.file.name = storage_path
+                    indexedfile.save(update_fields=["file"])
+
+        results = []
+        signalled = set()
+        for nfo, _metadata, _is_corrupt, _fp_nfo in analyzed:
+            indexedfile = indexedfiles[nfo["sha512"]]
+
+            # Only the first path seen for a hash this call inserted counts as created
+            created = nfo["sha512"] in inserted and nfo["sha512"] not in signalled
+            if created:
+                signalled.add(nfo["sha512"])
+                for receiver, response in indexedfile_added.send_robust(
+                    sender=indexedfile.__class__, instance=indexedfile
+                ):
+                    if isinstance(response, Exception):
+                        logger.error(
+                            f"indexedfile_added receiver {receiver!r} failed for {indexedfile.sha512[:10]}: {response}",
+                            exc_info=response,
+                        )
+            results.append((indexedfile, created))
+
+        return results
+
+    def _insert_new_files(self, new_files):
+        """
+        Insert IndexedFile rows for hashes that weren't indexed yet.
+
+        Args:
+            new_files: Dict of sha512 to the field values for its row
+
+        Returns:
+            Set of the hashes whose rows this call inserted. Hashes another
+            importer inserted in the meantime are left out.
+        """
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    [self.model(sha512=sha512, **fields) for sha512, fields in new_files.items()], batch_size=500
+                )
+            return set(new_files)
+        except IntegrityError:
+            # Another importer got to at least one of these hashes first, so
+            # go row by row to find out which ones are really ours
+            inserted = set()
+            for sha512, fields in new_files.items():
+                _indexedfile, created = self.get_or_create(sha512=sha512, defaults=fields)
+                if created:
+                    inserted.add(sha512)
+            return inserted
+
 
 class IndexedFile(models.Model):
     objects = IndexedFileManager()
@@ -226,7 +419,7 @@ class IndexedFile(models.Model):
     mime_type = models.CharField(max_length=255, db_index=True, null=True)
 
     file = models.FileField(max_length=2048)
-    first_seen = models.DateTimeField(null=False)
+    first_seen = models.DateTimeField(null=False, default=timezone.now)
 
     corrupt = models.BooleanField(default=None, null=True)
 
@@ -328,21 +521,30 @@ class IndexedFile(models.Model):
             ),
         ]
 
-    @property
+    @cached_property
     def path(self):
         """
         Generate path for file storage.
         New structure: fileindex/XX/YY/HASH (no padding, no extension)
+
+        Cached, as sha512 doesn't change once a file is indexed.
         """
+        return self.storage_path_for(self.sha512)
+
+    def refresh_from_db(self, *args, **kwargs):
+        # The cached path is derived from sha512, which the refresh reloads
+        self.__dict__.pop("path", None)
+        return super().refresh_from_db(*args, **kwargs)
+
+    @staticmethod
+    def storage_path_for(sha512):
+        """Return the storage path, relative to MEDIA_ROOT, for a file with this SHA-512."""
         # Remove padding from hash
-        hash_no_padding = self.sha512.rstrip("=")
+        hash_no_padding = sha512.rstrip("=")
 
-        return str(
-            Path("fileindex")
-            / hash_no_padding[0:2]  # First level
-            / hash_no_padding[2:4]  # Second level
-            / hash_no_padding  # Filename (no extension)
-        )
+        # FileField names are always POSIX paths, so build the string directly
+        # rather than through pathlib
+        return f"fileindex/{hash_no_padding[0:2]}/{hash_no_padding[2:4]}/{hash_no_padding}"
 
     @property
     def protected_url(self):
@@ -352,7 +554,11 @@ class IndexedFile(models.Model):
 
     @property
     def filename(self):
-        first = self.filepath_set.first()
+        prefetched = getattr(self, "_prefetched_filepaths", None)
+        if prefetched is not None:
+            first = prefetched[0] if prefetched else None
+        else:
+            first = self.filepath_set.first()
         if not first:
             raise ValueError("IndexedFile has no associated FilePath")
         return Path(first.path).name
@@ -364,7 +570,7 @@ class IndexedFile(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.first_seen:
-            self.first_seen = datetime.datetime.now(local_tz)
+            self.first_seen = datetime.datetime.now(datetime.UTC)
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -374,6 +580,9 @@ class IndexedFile(models.Model):
     def thumbnail(self):
         """Get thumbnail if this is a video file"""
         if self.mime_type and self.mime_type.startswith("video/"):
+            prefetched = getattr(self, "_prefetched_thumbnails", None)
+            if prefetched is not None:
+                return prefetched[0] if prefetched else None
             return self.derived_files.filter(derived_for="thumbnail").first()
         return None
 
@@ -388,7 +597,7 @@ class FilePath(models.Model):
     ctime = models.DateTimeField(null=False)
     hostname = models.CharField(max_length=1024, null=True)
     path = models.CharField(max_length=2048, db_index=True, null=False)
-    created_at = models.DateTimeField(null=False)
+    created_at = models.DateTimeField(null=False, default=timezone.now)
 
     class Meta:
         unique_together = [["indexedfile", "path"]]
@@ -398,5 +607,5 @@ class FilePath(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.created_at:
-            self.created_at = datetime.datetime.now(local_tz)
+            self.created_at = datetime.datetime.now(datetime.UTC)
         return super().save(*args, **kwargs)
@@ -1,11 +1,14 @@
 """Custom parsers for extracting duration from animated image formats.
 
 These parsers handle formats where Pillow doesn't provide duration metadata.
-Optimized for streaming file access and minimal memory usage.
+They read only container headers rather than loading whole files into memory.
 """
 
 import logging
+import mmap
+import os
 import struct
+from collections.abc import Iterator
 from typing import BinaryIO, Final
 
 logger = logging.getLogger(__name__)
@@ -15,10 +18,24 @@ WEBP_SIGNATURE: Final[bytes] = b"WEBP"
 RIFF_SIGNATURE: Final[bytes] = b"RIFF"
 AVIF_FTYP: Final[bytes] = b"ftyp"
 
-# Buffer sizes for streaming
-AVIF_SEARCH_BUFFER_SIZE: Final[int] = 8192  # 8KB chunks for searching mvhd
+# Container header sizes
+ISOBMFF_BOX_HEADER_SIZE: Final[int] = 8  # 4 bytes size + 4 bytes type
+WEBP_HEADER_SIZE: Final[int] = 12  # "RIFF" + file size + "WEBP"
 WEBP_CHUNK_HEADER_SIZE: Final[int] = 8
-ANMF_MIN_DATA_SIZE: Final[int] = 16
+ANMF_DURATION_END: Final[int] = 15  # Frame duration occupies ANMF payload bytes 12-14
+WEBP_MAX_FRAMES: Final[int] = 10_000  # Stop summing durations after this many frames
+GIF_SIGNATURES: Final[tuple[bytes, ...]] = (b"GIF87a", b"GIF89a")
+GIF_HEADER_SIZE: Final[int] = 13  # Signature + logical screen descriptor
+GIF_IMAGE_DESCRIPTOR_SIZE: Final[int] = 9  # After the 0x2C separator
+GIF_EXTENSION: Final[int] = 0x21
+GIF_IMAGE_SEPARATOR: Final[int] = 0x2C
+GIF_GRAPHIC_CONTROL_LABEL: Final[int] = 0xF9
+
+# Precompiled struct formats, so the format string isn't looked up per field
+_U32_BE: Final = struct.Struct(">I")
+_U64_BE: Final = struct.Struct(">Q")
+_U32_LE: Final = struct.Struct("<I")
+_BOX_HEADER: Final = struct.Struct(">I4s")
 
 
 def parse_avif_duration(file_path: str) -> int | None:
@@ -26,7 +43,7 @@ def parse_avif_duration(file_path: str) -> int | None:
 
     AVIF files use the ISOBMFF/HEIF container format. Duration is stored in
     the mvhd (movie header) box with an associated timescale.
-    Uses streaming approach to handle large files efficiently.
+    Only box headers are read, so large files are handled efficiently.
 
     Args:
         file_path: Path to the AVIF file
@@ -44,21 +61,21 @@ def parse_avif_duration(file_path: str) -> int | None:
 
 def _parse_avif_duration_streaming(f: BinaryIO, file_path: str) -> int | None:
     """Stream-based AVIF duration parsing to avoid loading entire file into memory."""
-    mvhd_pos = _find_mvhd_box_streaming(f)
+    mvhd_pos = _find_mvhd_box(f)
     if mvhd_pos == -1:
         logger.debug(f"No mvhd box found in {file_path}, likely not animated")
         return None
 
-    # Seek to mvhd box start
+    # Seek to mvhd box payload
     f.seek(mvhd_pos)
 
-    # Read mvhd box header and version info
-    mvhd_header = f.read(8)  # 4 bytes 'mvhd' + 1 byte version + 3 bytes flags
-    if len(mvhd_header) < 8:
+    # Read mvhd version info
+    mvhd_header = f.read(4)  # 1 byte version + 3 bytes flags
+    if len(mvhd_header) < 4:
         logger.warning(f"Incomplete mvhd header in {file_path}")
         return None
 
-    version = mvhd_header[4]
+    version = mvhd_header[0]
 
     # Skip creation and modification times, then read timescale and duration
     if version == 0:
@@ -68,8 +85,8 @@ def _parse_avif_duration_streaming(f: BinaryIO, file_path: str) -> int | None:
         if len(timescale_duration) < 8:
             logger.warning(f"Incomplete timescale/duration in {file_path}")
             return None
-        timescale = struct.unpack(">I", timescale_duration[:4])[0]
-        duration = struct.unpack(">I", timescale_duration[4:8])[0]
+        timescale = _U32_BE.unpack_from(timescale_duration)[0]
+        duration = _U32_BE.unpack_from(timescale_duration, 4)[0]
     elif version == 1:
         # Skip 64-bit creation and modification times
         f.seek(16, 1)
@@ -77,8 +94,8 @@ def _parse_avif_duration_streaming(f: BinaryIO, file_path: str) -> int | None:
         if len(timescale_duration) < 12:
             logger.warning(f"Incomplete timescale/duration in {file_path}")
             return None
-        timescale = struct.unpack(">I", timescale_duration[:4])[0]
-        duration = struct.unpack(">Q", timescale_duration[4:12])[0]
+        timescale = _U32_BE.unpack_from(timescale_duration)[0]
+        duration = _U64_BE.unpack_from(timescale_duration, 4)[0]
     else:
         logger.warning(f"Unknown mvhd version {version} in {file_path}")
         return None
@@ -97,30 +114,54 @@ def _parse_avif_duration_streaming(f: BinaryIO, file_path: str) -> int | None:
         return None
 
 
-def _find_mvhd_box_streaming(f: BinaryIO) -> int:
-    """Find mvhd box position using streaming search to avoid loading entire file."""
-    f.seek(0)
-    buffer = b""
-    position = 0
+def _find_mvhd_box(f: BinaryIO) -> int:
+    """Find the payload offset of the moov/mvhd box, or -1 if there isn't one.
 
-    while True:
-        chunk = f.read(AVIF_SEARCH_BUFFER_SIZE)
-        if not chunk:
-            break
+    Only box headers are read: top-level boxes are skipped until moov, then
+    its children are scanned for mvhd. This avoids scanning image data,
+    which could also contain the bytes b"mvhd".
+    """
+    file_size = os.fstat(f.fileno()).st_size
 
-        # Combine with previous partial buffer
-        search_data = buffer + chunk
+    for box_type, start, end in _iter_boxes(f, 0, file_size):
+        if box_type == b"moov":
+            for child_type, child_start, _child_end in _iter_boxes(f, start, end):
+                if child_type == b"mvhd":
+                    return child_start
+            return -1
 
-        # Look for mvhd pattern
-        mvhd_offset = search_data.find(b"mvhd")
-        if mvhd_offset != -1:
-            return position + mvhd_offset
+    return -1
 
-        # Keep last few bytes for next search in case mvhd spans chunks
-        buffer = search_data[-8:] if len(search_data) >= 8 else search_data
-        position += len(chunk)
 
-    return -1
+def _iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield (type, payload_start, payload_end) for each ISOBMFF box in [start, end)."""
+    pos = start
+    while pos + ISOBMFF_BOX_HEADER_SIZE <= end:
+        f.seek(pos)
+        header = f.read(ISOBMFF_BOX_HEADER_SIZE)
+        if len(header) < ISOBMFF_BOX_HEADER_SIZE:
+            return
+
+        box_size, box_type = _BOX_HEADER.unpack(header)
+        header_size = ISOBMFF_BOX_HEADER_SIZE
+
+        if box_size == 1:
+            # 64-bit size follows the type
+            large_size = f.read(8)
+            if len(large_size) < 8:
+                return
+            box_size = _U64_BE.unpack(large_size)[0]
+            header_size += 8
+        elif box_size == 0:
+            # Box extends to the end of its container
+            box_size = end - pos
+
+        if box_size < header_size:
+            logger.debug(f"Malformed ISOBMFF box {box_type!r} at offset {pos}")
+            return
+
+        yield box_type, pos + header_size, min(pos + box_size, end)
+        pos += box_size
 
 
 def parse_webp_duration(file_path: str) -> int | None:
@@ -128,7 +169,8 @@ def parse_webp_duration(file_path: str) -> int | None:
 
     WebP uses RIFF container format. Animated WebP files contain ANMF chunks
     with frame durations stored as 24-bit values.
-    Uses streaming approach with early exit optimization.
+    The file is memory-mapped and its chunks walked by offset, without a
+    read or seek call per chunk.
 
     Args:
         file_path: Path to the WebP file
@@ -138,57 +180,51 @@ def parse_webp_duration(file_path: str) -> int | None:
     """
     try:
         with open(file_path, "rb") as f:
-            return _parse_webp_duration_streaming(f, file_path)
+            return _parse_webp_duration_mmap(f, file_path)
     except Exception as e:
         logger.error(f"Failed to parse WebP duration from {file_path}: {e}")
         return None
 
 
-def _parse_webp_duration_streaming(f: BinaryIO, file_path: str) -> int | None:
-    """Stream-based WebP duration parsing with early exit optimization."""
+def _parse_webp_duration_mmap(f: BinaryIO, file_path: str) -> int | None:
+    """Walk the RIFF chunks of a memory-mapped WebP file, summing ANMF frame durations."""
     # Validate RIFF/WebP headers
     if not _validate_webp_headers(f, file_path):
         return None
 
     total_duration = 0
     frame_count = 0
-    has_anim_chunk = False
 
-    # Parse chunks with early exit optimization
-    while True:
-        chunk_header = f.read(WEBP_CHUNK_HEADER_SIZE)
-        if len(chunk_header) < WEBP_CHUNK_HEADER_SIZE:
-            break
-
-        chunk_fourcc = chunk_header[:4]
-        chunk_size = struct.unpack("<I", chunk_header[4:8])[0]
-
-        if chunk_fourcc == b"ANIM":
-            # Animation parameters chunk - confirms this is animated WebP
-            has_anim_chunk = True
-            f.seek(chunk_size, 1)  # Skip ANIM data
-        elif chunk_fourcc == b"ANMF":
-            # Animation frame chunk
-            frame_duration = _parse_anmf_chunk_duration(f, chunk_size, file_path)
-            if frame_duration is not None:
-                total_duration += frame_duration
-                frame_count += 1
-            else:
-                # Skip remaining chunk data if parsing failed
-                f.seek(chunk_size, 1)
-        else:
-            # Skip non-animation chunks
-            f.seek(chunk_size, 1)
-
-        # Align to even boundary if necessary
-        if chunk_size % 2 == 1:
-            f.seek(1, 1)
-
-        # Early exit optimization: if we found animation frames but no ANIM chunk,
-        # we likely have enough info for a basic animated WebP
-        if frame_count > 1 and total_duration > 0 and not has_anim_chunk:
-            # Continue parsing to get complete duration, but we know it's animated
-            pass
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm)
+        pos = WEBP_HEADER_SIZE
+
+        while pos + WEBP_CHUNK_HEADER_SIZE <= end:
+            chunk_fourcc = mm[pos : pos + 4]
+            chunk_size = _U32_LE.unpack_from(mm, pos + 4)[0]
+            data_start = pos + WEBP_CHUNK_HEADER_SIZE
+
+            if chunk_fourcc == b"ANMF":
+                # ANMF chunk structure:
+                # 0-2: Frame X
+                # 3-5: Frame Y
+                # 6-8: Frame Width minus 1
+                # 9-11: Frame Height minus 1
+                # 12-14: Frame Duration (24-bit, little-endian)
+                # 15: Flags
+                if chunk_size >= ANMF_DURATION_END and data_start + ANMF_DURATION_END <= end:
+                    total_duration += int.from_bytes(mm[data_start + 12 : data_start + ANMF_DURATION_END], "little")
+                    frame_count += 1
+                    if frame_count >= WEBP_MAX_FRAMES:
+                        logger.warning(
+                            f"WebP frame limit ({WEBP_MAX_FRAMES}) reached in {file_path}, duration is truncated"
+                        )
+                        break
+                else:
+                    logger.warning(f"ANMF chunk too small in {file_path}: {chunk_size} bytes")
+
+            # Chunks are padded to an even size
+            pos = data_start + chunk_size + (chunk_size & 1)
 
     # Only return duration if we found multiple animated frames
     if frame_count > 1 and total_duration > 0:
@@ -221,39 +257,92 @@ def _validate_webp_headers(f: BinaryIO, file_path: str) -> bool:
     return True
 
 
-def _parse_anmf_chunk_duration(f: BinaryIO, chunk_size: int, file_path: str) -> int | None:
-    """Parse duration from ANMF chunk efficiently."""
-    # ANMF chunk structure:
-    # 0-2: Frame X
-    # 3-5: Frame Y
-    # 6-8: Frame Width minus 1
-    # 9-11: Frame Height minus 1
-    # 12-14: Frame Duration (24-bit, little-endian)
-    # 15: Flags
-
-    # We only need bytes 12-14 for duration, but read minimum required
-    anmf_data = f.read(min(chunk_size, ANMF_MIN_DATA_SIZE))
-
-    if len(anmf_data) >= 15:
-        # Extract 24-bit duration (bytes 12-14)
-        duration_bytes = anmf_data[12:15] + b"\x00"  # Add padding for 32-bit unpack
-        try:
-            frame_duration = struct.unpack("<I", duration_bytes)[0]
-
-            # Skip rest of chunk data
-            remaining = chunk_size - len(anmf_data)
-            if remaining > 0:
-                f.seek(remaining, 1)
-
-            return frame_duration
-        except struct.error as e:
-            logger.warning(f"Failed to unpack ANMF duration in {file_path}: {e}")
-    else:
-        logger.warning(f"ANMF chunk too small in {file_path}: {len(anmf_data)} bytes")
+def parse_gif_duration(file_path: str) -> int | None:
+    """Extract total duration from GIF file by walking its blocks.
+
+    Frame delays live in the Graphic Control Extension in front of each
+    image, so the image data itself is skipped instead of LZW-decoded the
+    way seeking through the frames with Pillow does.
 
-    # Skip rest of chunk if parsing failed
-    remaining = chunk_size - len(anmf_data)
-    if remaining > 0:
-        f.seek(remaining, 1)
+    Args:
+        file_path: Path to the GIF file
 
-    return None
+    Returns:
+        Total duration in milliseconds or None if not animated/error
+    """
+    try:
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse_gif_duration_mmap(mm, file_path)
+    except Exception as e:
+        logger.error(f"Failed to parse GIF duration from {file_path}: {e}")
+        return None
+
+
+def _skip_gif_sub_blocks(mm: mmap.mmap, pos: int) -> int:
+    """Return the offset just past a chain of GIF data sub-blocks."""
+    end = len(mm)
+    while pos < end:
+        block_size = mm[pos]
+        pos += 1 + block_size
+        if block_size == 0:
+            break
+    return pos
+
+
+def _parse_gif_duration_mmap(mm: mmap.mmap, file_path: str) -> int | None:
+    """Sum the frame delays of a memory-mapped GIF file."""
+    if mm[:6] not in GIF_SIGNATURES or len(mm) < GIF_HEADER_SIZE:
+        logger.warning(f"Not a GIF file: {file_path}")
+        return None
+
+    total_duration = 0
+    frame_count = 0
+    frame_duration = None
+
+    # Skip the global color table if there is one
+    flags = mm[10]
+    pos = GIF_HEADER_SIZE + (3 << ((flags & 0x07) + 1) if flags & 0x80 else 0)
+    end = len(mm)
+
+    while pos < end:
+        block_type = mm[pos]
+        pos += 1
+
+        if block_type == GIF_EXTENSION and pos < end:
+            label = mm[pos]
+            pos += 1
+            # Graphic Control Extension: size (4), flags, delay (u16 LE, 1/100s), transparent index
+            if label == GIF_GRAPHIC_CONTROL_LABEL and pos + 4 < end and mm[pos] >= 4:
+                frame_duration = int.from_bytes(mm[pos + 2 : pos + 4], "little") * 10
+            pos = _skip_gif_sub_blocks(mm, pos)
+
+        elif block_type == GIF_IMAGE_SEPARATOR:
+            # Every frame needs its own delay, like Pillow's per-frame info["duration"]
+            if frame_duration is None:
+                logger.warning(f"GIF frame missing duration in {file_path}, skipping")
+                break
+            total_duration += frame_duration
+            frame_count += 1
+            frame_duration = None
+
+            if pos + GIF_IMAGE_DESCRIPTOR_SIZE > end:
+                break
+            flags = mm[pos + 8]
+            pos += GIF_IMAGE_DESCRIPTOR_SIZE
+            if flags & 0x80:
+                # Local color table
+                pos += 3 << ((flags & 0x07) + 1)
+            # LZW minimum code size, then the image data sub-blocks
+            pos = _skip_gif_sub_blocks(mm, pos + 1)
+
+        else:
+            # Trailer (0x3B) or garbage
+            break
+
+    # Only return duration if we found multiple animated frames
+    if frame_count > 1 and total_duration > 0:
+        logger.debug(f"GIF duration: {total_duration}ms ({frame_count} frames)")
+        return total_duration
+    else:
+        logger.debug(f"GIF not animated or no duration found: {frame_count} frames, {total_duration}ms")
+        return None
@@ -1,19 +1,53 @@
 """Service for ffprobe utilities and subprocess management."""
 
+import functools
 import json
 import logging
+import os
 import subprocess
+import threading
+from concurrent.futures import Future
 from typing import Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-# Cache for ffprobe version
-_ffprobe_version: str | None = None
+# orjson parses the (sometimes large) ffprobe output much faster when installed
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Everything but the input path, built once rather than on every probe
+_FFPROBE_ARGS = (
+    "ffprobe",
+    "-v",
+    "quiet",
+    "-print_format",
+    "json",
+    "-show_format",
+    "-show_streams",
+    "-show_program_version",
+)
+
+# Probes currently running, by (path, file version). Concurrent callers for
+# the same file wait for the running probe instead of starting their own.
+_in_flight: dict[tuple[str, tuple[int, int, int, int]], Future] = {}
+_in_flight_lock = threading.Lock()
+
+# Version reported by the last successful run_ffprobe(), see get_cached_ffprobe_version()
+_probed_version: str | None = None
 
 
+@functools.cache
 def get_ffprobe_version() -> str | None:
     """Get the version string of ffprobe.
 
+    The result is cached for the life of the process, including a None result,
+    so a missing ffprobe isn't re-probed on every call. Use
+    get_ffprobe_version.cache_clear() to force a new check.
+
     Returns:
         Version string like "4.4.2-0ubuntu0.22.04.1" or None if unable to determine
     """
@@ -42,46 +76,117 @@ def get_ffprobe_version() -> str | None:
 def get_cached_ffprobe_version() -> str | None:
     """Get cached ffprobe version to avoid repeated subprocess calls.
 
+    run_ffprobe() asks ffprobe for its version along with the probe, so once a
+    file has been probed no separate "ffprobe -version" process is needed.
+
     Returns:
         Cached version string or None
     """
-    global _ffprobe_version
-    if _ffprobe_version is None:
-        _ffprobe_version = get_ffprobe_version()
-    return _ffprobe_version
+    return _probed_version or get_ffprobe_version()
+
+
+def _ffprobe_output(file_path: str, timeout: int) -> bytes:
+    """Run ffprobe and return its JSON output, raising CalledProcessError on failure."""
+    cmd = [*_FFPROBE_ARGS, file_path]
+
+    # Keep stdout as bytes, both JSON parsers take them without decoding first
+    result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    return result.stdout
+
+
+def _file_version(stat: os.stat_result) -> tuple[int, int, int, int]:
+    """
+    Identify the contents of a file by (device, inode, mtime_ns, size).
+
+    The device and inode catch a file replaced by rename with one that has the
+    same size and mtime, as copies that preserve timestamps produce.
+    """
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
 
-def run_ffprobe(file_path: str, timeout: int = 30) -> dict[str, Any] | None:
+@functools.lru_cache(maxsize=512)
+def _cached_ffprobe_output(file_path: str, version: tuple[int, int, int, int], timeout: int) -> bytes:
+    # version is only part of the cache key, so a file that changes on disk
+    # is probed again. Failures raise and so are never cached.
+    return _ffprobe_output(file_path, timeout)
+
+
+def _shared_ffprobe_output(file_path: str, version: tuple[int, int, int, int], timeout: int) -> bytes:
+    """Like _cached_ffprobe_output(), but callers probing the same file at once share one run."""
+    key = (file_path, version)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        running = future is not None
+        if not running:
+            future = _in_flight[key] = Future()
+
+    if running:
+        return future.result()
+
+    try:
+        output = _cached_ffprobe_output(file_path, version, timeout)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(output)
+        return output
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+def clear_ffprobe_cache() -> None:
+    """Forget cached run_ffprobe() results, e.g. in long-running workers."""
+    global _probed_version
+    _cached_ffprobe_output.cache_clear()
+    _probed_version = None
+
+
+def run_ffprobe(file_path: str, timeout: int = 30, stat: os.stat_result | None = None) -> dict[str, Any] | None:
     """Run ffprobe and return parsed JSON output.
 
+    The ffprobe output is cached per (path, device, inode, mtime, size), so
+    probing the same unchanged file again doesn't spawn another process,
+    including when several threads ask for the same file at once. Each call
+    still returns a freshly parsed dict.
+
     Args:
         file_path: Path to the media file
         timeout: Command timeout in seconds
+        stat: os.stat() result for file_path, if the caller already has one
 
     Returns:
         Parsed JSON output from ffprobe or None on error
     """
+    global _probed_version
+
     try:
-        cmd = [
-            "ffprobe",
-            "-v",
-            "quiet",
-            "-print_format",
-            "json",
-            "-show_format",
-            "-show_streams",
-            file_path,
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        if result.returncode != 0:
-            logger.error(f"ffprobe failed for {file_path}: {result.stderr}")
-            return None
-
-        return json.loads(result.stdout)
+        try:
+            if stat is None:
+                stat = os.stat(file_path)
+        except OSError:
+            # Let ffprobe report the problem, there is nothing to key a cache on
+            output = _ffprobe_output(file_path, timeout)
+        else:
+            output = _shared_ffprobe_output(file_path, _file_version(stat), timeout)
+
+        data = _json_loads(output)
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode(errors="replace")
+        logger.error(f"ffprobe failed for {file_path}: {stderr}")
+        return None
     except subprocess.TimeoutExpired:
         logger.error(f"ffprobe timed out for {file_path}")
         return None
     except (subprocess.SubprocessError, json.JSONDecodeError) as e:
         logger.error(f"Error running ffprobe: {e}")
         return None
+
+    # Remember the version, and return the same data as before it was requested
+    program_version = data.pop("program_version", None)
+    if program_version and program_version.get("version"):
+        _probed_version = program_version["version"]
+    return data
@@ -7,15 +7,24 @@ used by management commands and other parts of the application.
 
 import logging
 import os
-from collections.abc import Callable
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
 from typing import Any
 
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from fileindex import fileutils
 from fileindex.exceptions import ImportErrorType
 from fileindex.models import IndexedFile
-from fileindex.services.file_validation import should_import
+from fileindex.services.file_validation import should_import, should_import_filename
 
 logger = logging.getLogger(__name__)
 
+# Number of files read ahead of the one being imported in serial imports
+PREFETCH_WINDOW = 4
+
 
 def import_file(
     filepath: str,
@@ -24,6 +33,7 @@ def import_file(
     symlink: bool = False,
     validate: bool = True,
     hash_progress_callback: Callable[[int, int], None] | None = None,
+    _entry: os.DirEntry | None = None,
 ) -> tuple[IndexedFile | None, bool, ImportErrorType | None]:
     """
     Import a single file into the IndexedFile system.
@@ -42,12 +52,12 @@ def import_file(
         - error_message: Error message if failed, None if successful
     """
     # Validate if file should be imported
-    if validate and not should_import(filepath):
+    if validate and not should_import(filepath, entry=_entry):
         logger.debug(f"Skipping file (validation failed): {filepath}")
         return None, False, ImportErrorType.VALIDATION_FAILED
 
-    # Check if file exists
-    if not os.path.exists(filepath):
+    # Check if file exists, unless it was just found by a directory scan
+    if _entry is None and not os.path.exists(filepath):
         logger.error(f"File does not exist: {filepath}")
         return None, False, ImportErrorType.FILE_NOT_EXISTS
 
@@ -57,25 +67,7 @@ def import_file(
             filepath, only_hard_link=only_hard_link, hash_progress_callback=hash_progress_callback
         )
 
-        # Replace original with symlink to managed file
-        if symlink and indexed_file and os.path.exists(filepath) and not os.path.islink(filepath):
-            try:
-                managed_path = indexed_file.file.path
-                os.unlink(filepath)
-                os.symlink(managed_path, filepath)
-                logger.info(f"Replaced original with symlink: {filepath} -> {managed_path}")
-            except OSError as e:
-                logger.warning(f"Could not create symlink for {filepath}: {e}")
-
-        # Delete original if requested and import was successful
-        if delete_after and indexed_file:
-            try:
-                os.unlink(filepath)
-                logger.info(f"Deleted original file: {filepath}")
-            except OSError as e:
-                logger.warning(f"Could not delete original file {filepath}: {e}")
-
-        logger.info(f"{'Created' if created else 'Found existing'} IndexedFile: {indexed_file.sha512[:10]}...")
+        _finish_import(filepath, indexed_file, created, symlink=symlink, delete_after=delete_after)
         return indexed_file, created, None
 
     except Exception as e:
@@ -83,6 +75,247 @@ def import_file(
         return None, False, ImportErrorType.IMPORT_FAILED
 
 
+def _finish_import(
+    filepath: str, indexed_file: IndexedFile, created: bool, symlink: bool = False, delete_after: bool = False
+):
+    """Replace or delete the original file once it has been indexed."""
+    # Replace original with symlink to managed file
+    if symlink and indexed_file and os.path.exists(filepath) and not os.path.islink(filepath):
+        try:
+            managed_path = indexed_file.file.path
+            os.unlink(filepath)
+            os.symlink(managed_path, filepath)
+            logger.info(f"Replaced original with symlink: {filepath} -> {managed_path}")
+        except OSError as e:
+            logger.warning(f"Could not create symlink for {filepath}: {e}")
+
+    # Delete original if requested and import was successful
+    if delete_after and indexed_file:
+        try:
+            os.unlink(filepath)
+            logger.info(f"Deleted original file: {filepath}")
+        except OSError as e:
+            logger.warning(f"Could not delete original file {filepath}: {e}")
+
+    logger.info(f"{'Created' if created else 'Found existing'} IndexedFile: {indexed_file.sha512[:10]}...")
+
+
+def _import_one(item: str | os.DirEntry, **kwargs) -> tuple[IndexedFile | None, bool, ImportErrorType | None]:
+    if isinstance(item, os.DirEntry):
+        return import_file(item.path, _entry=item, **kwargs)
+    return import_file(item, **kwargs)
+
+
+def _is_failure(result: tuple[IndexedFile | None, bool, ImportErrorType | None]) -> bool:
+    """Whether an import_file() result is an error, as opposed to a success or a skipped file."""
+    error = result[2]
+    return error is not None and error != ImportErrorType.VALIDATION_FAILED
+
+
+class ImportWorkerPool(ThreadPoolExecutor):
+    """
+    Thread pool for importing files.
+
+    Each worker opens its own database connection and keeps it for every file
+    it imports. shutdown(wait=True), including leaving a with block, closes
+    those connections once the workers are done, so they aren't leaked.
+    """
+
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = "fileindex-import"):
+        self._worker_connections = []
+        super().__init__(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix, initializer=self._share_worker_connection
+        )
+
+    def _share_worker_connection(self) -> None:
+        # Run once in each worker thread. Allowing the connection to be shared
+        # lets shutdown() close it from the calling thread.
+        worker_connection = connections[DEFAULT_DB_ALIAS]
+        worker_connection.inc_thread_sharing()
+        self._worker_connections.append(worker_connection)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        if not wait:
+            # Workers may still be using their connections
+            return
+        while self._worker_connections:
+            worker_connection = self._worker_connections.pop()
+            worker_connection.close()
+            worker_connection.dec_thread_sharing()
+
+
+def _iter_bulk_imports(
+    filepaths: Iterable[str | os.DirEntry],
+    batch_size: int,
+    max_workers: int,
+    only_hard_link: bool = False,
+    delete_after: bool = False,
+    validate: bool = True,
+    hash_progress_callback: Callable[[int, int], None] | None = None,
+    stop_on_error: bool = False,
+) -> Iterator[tuple[str, tuple[IndexedFile | None, bool, ImportErrorType | None]]]:
+    """
+    Like _iter_imports(), but indexes batch_size files at a time with
+    IndexedFile.objects.get_or_create_from_files(), which writes the rows of a
+    whole batch with bulk_create() in one transaction.
+
+    If a batch fails, its files are imported again one at a time so that the
+    error is reported against the file that caused it. A failed batch hasn't
+    written any rows, so files that import fine on the retry are still
+    reported as created. hash_progress_callback is only used for those
+    retries.
+    """
+    for batch in batched(filepaths, batch_size):
+        results = {}
+        to_import = []
+        for item in batch:
+            filepath = os.fspath(item)
+            entry = item if isinstance(item, os.DirEntry) else None
+            if validate and not should_import(filepath, entry=entry):
+                logger.debug(f"Skipping file (validation failed): {filepath}")
+                results[filepath] = (None, False, ImportErrorType.VALIDATION_FAILED)
+            else:
+                to_import.append(item)
+
+        try:
+            indexed = (
+                IndexedFile.objects.get_or_create_from_files(
+                    [os.fspath(item) for item in to_import],
+                    only_hard_link=only_hard_link,
+                    max_workers=max_workers,
+                )
+                if to_import
+                else []
+            )
+        except Exception as e:
+            logger.warning(f"Batch import failed, importing {len(to_import)} files one at a time: {e}")
+            for item in to_import:
+                result = results[os.fspath(item)] = _import_one(
+                    item,
+                    only_hard_link=only_hard_link,
+                    delete_after=delete_after,
+                    validate=False,
+                    hash_progress_callback=hash_progress_callback,
+                )
+                if stop_on_error and _is_failure(result):
+                    break
+        else:
+            for item, (indexed_file, created) in zip(to_import, indexed, strict=True):
+                filepath = os.fspath(item)
+                _finish_import(filepath, indexed_file, created, delete_after=delete_after)
+                results[filepath] = (indexed_file, created, None)
+
+        for item in batch:
+            filepath = os.fspath(item)
+            if filepath in results:
+                yield filepath, results[filepath]
+
+        if stop_on_error and any(_is_failure(result) for result in results.values()):
+            return
+
+
+def _iter_imports(
+    filepaths: Iterable[str | os.DirEntry],
+    max_workers: int,
+    batch_size: int | None = None,
+    stop_on_error: bool = False,
+    **kwargs,
+) -> Iterator[tuple[str, tuple[IndexedFile | None, bool, ImportErrorType | None]]]:
+    """
+    Import files, yielding (filepath, import_file() result) in input order.
+
+    Items may be paths or DirEntry objects from _scan_files(), whose cached
+    file type spares validation a stat() call.
+
+    With max_workers > 1 files are imported on a thread pool, so hashing one
+    file overlaps with reading the next and with ffprobe subprocesses. Closing
+    the generator early cancels imports that haven't started yet.
+
+    With batch_size set, files are imported in batches by _iter_bulk_imports().
+
+    With stop_on_error, no more imports are started after the first failure.
+    Files that were already being imported when it happened still finish and
+    are yielded, since they may have been moved or deleted by then.
+    """
+    if batch_size:
+        yield from _iter_bulk_imports(filepaths, batch_size, max_workers, stop_on_error=stop_on_error, **kwargs)
+        return
+
+    if max_workers <= 1:
+        for item in _prefetched(filepaths, validate=kwargs.get("validate", True)):
+            result = _import_one(item, **kwargs)
+            yield os.fspath(item), result
+            if stop_on_error and _is_failure(result):
+                return
+        return
+
+    filepaths = list(filepaths)
+    executor = ImportWorkerPool(max_workers=max_workers)
+    try:
+        futures = [executor.submit(_import_one, item, **kwargs) for item in filepaths]
+        stopping = False
+        for item, future in zip(filepaths, futures, strict=True):
+            if stopping and future.cancelled():
+                continue
+            result = future.result()
+            yield os.fspath(item), result
+            if stop_on_error and not stopping and _is_failure(result):
+                # Imports that are already running can't be cancelled, report them as they finish
+                stopping = True
+                for pending in futures:
+                    pending.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _prefetched(
+    filepaths: Iterable[str | os.DirEntry], validate: bool = True, window: int = PREFETCH_WINDOW
+) -> Iterator[str | os.DirEntry]:
+    """
+    Yield filepaths unchanged, asking the kernel to read the next few files
+    into the page cache while the current one is being hashed.
+
+    With validate, files whose names won't pass validation aren't prefetched.
+    """
+    pending = deque()
+    for item in filepaths:
+        if not validate or should_import_filename(os.fspath(item)):
+            fileutils.prefetch_file(item)
+        pending.append(item)
+        if len(pending) > window:
+            yield pending.popleft()
+    yield from pending
+
+
+def _scan_files(dirpath: str, recursive: bool) -> Iterator[os.DirEntry]:
+    """
+    Yield DirEntry objects for the files under dirpath in a consistent order.
+
+    Files in a directory come before its subdirectories, like os.walk().
+    Symlinked directories are not followed.
+    """
+    try:
+        with os.scandir(dirpath) as it:
+            # Sort for consistent ordering
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        logger.warning(f"Could not scan directory {dirpath}: {e}")
+        return
+
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():
+                subdirs.append(entry)
+        else:
+            yield entry
+
+    if recursive:
+        for entry in subdirs:
+            yield from _scan_files(entry.path, recursive)
+
+
 def import_directory(
     dirpath: str,
     recursive: bool = True,
@@ -91,6 +324,8 @@ def import_directory(
     validate: bool = True,
     progress_callback: Callable[[str, bool, str | None], None] | None = None,
     hash_progress_callback: Callable[[int, int], None] | None = None,
+    max_workers: int = 1,
+    batch_size: int | None = None,
 ) -> dict[str, Any]:
     """
     Import all files from a directory.
@@ -103,6 +338,11 @@ def import_directory(
         validate: If True, check if files should be imported using validation rules
         progress_callback: Optional callback function(filepath, success, error_msg) called for each file
         hash_progress_callback: Optional callback(bytes_processed, total_bytes) for hash progress
+        max_workers: Number of files to import concurrently. With more than one worker,
+                     hash_progress_callback is called from the worker threads.
+        batch_size: If set, index this many files at a time and write their rows with
+                    bulk_create() in a single transaction. hash_progress_callback is not
+                    called for files imported this way.
 
     Returns:
         Dictionary with import statistics:
@@ -128,44 +368,32 @@ def import_directory(
         logger.error(f"Path is not a directory: {dirpath}")
         return stats
 
-    # Walk the directory
-    for root, dirs, files in os.walk(dirpath):
-        # Sort for consistent ordering
-        dirs.sort()
-        files.sort()
-
-        # Process each file
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            stats["total_files"] += 1
-
-            # Import the file
-            indexed_file, created, error = import_file(
-                filepath,
-                only_hard_link=only_hard_link,
-                delete_after=delete_after,
-                validate=validate,
-                hash_progress_callback=hash_progress_callback,
-            )
+    imports = _iter_imports(
+        _scan_files(dirpath, recursive),
+        max_workers,
+        batch_size=batch_size,
+        only_hard_link=only_hard_link,
+        delete_after=delete_after,
+        validate=validate,
+        hash_progress_callback=hash_progress_callback,
+    )
+    for filepath, (_indexed_file, created, error) in imports:
+        stats["total_files"] += 1
 
-            # Update statistics
-            if error:
-                if error == ImportErrorType.VALIDATION_FAILED:
-                    stats["skipped"] += 1
-                else:
-                    stats["errors"][filepath] = str(error)
+        # Update statistics
+        if error:
+            if error == ImportErrorType.VALIDATION_FAILED:
+                stats["skipped"] += 1
             else:
-                stats["imported"] += 1
-                if created:
-                    stats["created"] += 1
-
-            # Call progress callback if provided
-            if progress_callback:
-                progress_callback(filepath, error is None, str(error) if error else None)
+                stats["errors"][filepath] = str(error)
+        else:
+            stats["imported"] += 1
+            if created:
+                stats["created"] += 1
 
-        # Stop recursion if not recursive
-        if not recursive:
-            break
+        # Call progress callback if provided
+        if progress_callback:
+            progress_callback(filepath, error is None, str(error) if error else None)
 
     return stats
 
@@ -178,6 +406,8 @@ def batch_import_files(
     progress_callback: Callable[[str, bool, str | None], None] | None = None,
     stop_on_error: bool = False,
     hash_progress_callback: Callable[[int, int], None] | None = None,
+    max_workers: int = 1,
+    batch_size: int | None = None,
 ) -> dict[str, Any]:
     """
     Import multiple files in batch.
@@ -188,8 +418,11 @@ def batch_import_files(
         delete_after: If True, delete original files after successful import
         validate: If True, check if files should be imported using validation rules
         progress_callback: Optional callback(filepath, success, error_msg)
-        stop_on_error: If True, stop processing on first error
+        stop_on_error: If True, stop processing on first error. Files already being imported
+                       on other workers at that point still finish and are counted.
         hash_progress_callback: Optional callback(bytes_processed, total_bytes) for hash progress
+        max_workers: Number of files to import concurrently (see import_directory)
+        batch_size: Number of files to write per bulk_create() (see import_directory)
 
     Returns:
         Dictionary with import statistics (same as import_directory)
@@ -202,25 +435,26 @@ def batch_import_files(
         "errors": {},
     }
 
-    for filepath in file_paths:
-        # Import the file
-        indexed_file, created, error = import_file(
-            filepath,
-            only_hard_link=only_hard_link,
-            delete_after=delete_after,
-            validate=validate,
-            hash_progress_callback=hash_progress_callback,
-        )
-
+    imports = _iter_imports(
+        file_paths,
+        max_workers,
+        batch_size=batch_size,
+        stop_on_error=stop_on_error,
+        only_hard_link=only_hard_link,
+        delete_after=delete_after,
+        validate=validate,
+        hash_progress_callback=hash_progress_callback,
+    )
+    for filepath, (_indexed_file, created, error) in imports:
         # Update statistics
         if error:
             if error == ImportErrorType.VALIDATION_FAILED:
                 stats["skipped"] += 1
             else:
                 stats["errors"][filepath] = str(error)
-                if stop_on_error:
+                if stop_on_error and len(stats["errors"]) == 1:
+                    # _iter_imports() stops here too, after reporting the imports already under way
                     logger.error(f"Stopping batch import due to error: {error}")
-                    break
         else:
             stats["imported"] += 1
             if created:
@@ -254,18 +488,9 @@ def find_importable_files(
     if not os.path.exists(dirpath) or not os.path.isdir(dirpath):
         return importable_files
 
-    for root, dirs, files in os.walk(dirpath):
-        dirs.sort()
-        files.sort()
-
-        for filename in files:
-            filepath = os.path.join(root, filename)
-
-            # Check if file should be imported
-            if not validate or should_import(filepath):
-                importable_files.append(filepath)
-
-        if not recursive:
-            break
+    for entry in _scan_files(dirpath, recursive):
+        # Check if file should be imported
+        if not validate or should_import(entry.path, entry=entry):
+            importable_files.append(entry.path)
 
     return importable_files
@@ -1,6 +1,9 @@
 """File validation service for security checks."""
 
-from pathlib import Path
+import functools
+import os
+import re
+import stat
 
 # Security configuration for file imports
 ALLOWED_EXTENSIONS = {
@@ -17,33 +20,55 @@ ALLOWED_EXTENSIONS = {
 DISALLOWED_PATTERNS = ["..", "/etc/", "/proc/", "/sys/"]
 
 
+@functools.lru_cache(maxsize=1)
+def _disallowed_re(patterns: tuple[str, ...]) -> re.Pattern | None:
+    """Compile DISALLOWED_PATTERNS into one regex, again only when the list changes."""
+    if not patterns:
+        return None
+    return re.compile("|".join(map(re.escape, patterns)))
+
+
 def should_import_filename(filename):
     """Check if a filename is safe to import"""
     if not filename:
         return False
 
+    filename = filename.lower()
+
     # Check for path traversal attempts
-    if any(pattern in filename.lower() for pattern in DISALLOWED_PATTERNS):
+    disallowed = _disallowed_re(tuple(DISALLOWED_PATTERNS))
+    if disallowed and disallowed.search(filename):
         return False
 
     # Check file extension
-    path = Path(filename)
-    return path.suffix.lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1] in ALLOWED_EXTENSIONS
 
 
-def should_import(filepath):
-    """Check if a file path is safe to import"""
+def should_import(filepath, entry=None):
+    """Check if a file path is safe to import
+
+    Only regular files are accepted; symlinks are rejected rather than
+    followed. entry may be the os.DirEntry the path came from; its cached
+    file type is used instead of stat()ing the file again.
+    """
     if not filepath:
         return False
 
-    path = Path(filepath)
+    filepath = os.fspath(filepath)
 
-    # Basic security checks
-    if not path.exists():
+    # The name checks are free, so files with the wrong extension are
+    # rejected before touching the filesystem
+    if not should_import_filename(filepath):
         return False
 
     # Check if it's actually a file (not a directory or symlink)
-    if not path.is_file():
-        return False
+    if entry is not None:
+        # Answered from the directory listing, no syscall needed
+        return entry.is_file(follow_symlinks=False)
 
-    return should_import_filename(str(path))
+    # One lstat() covers "exists", "is a regular file" and "isn't a symlink"
+    try:
+        st = os.lstat(filepath)
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISREG(st.st_mode)
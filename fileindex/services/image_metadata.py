@@ -1,12 +1,11 @@
 """Service for extracting metadata from image files using ONLY Pillow."""
 
 import logging
-from itertools import chain
 from typing import Any, Final, Literal
 
 from PIL import Image, ImageFile, ImageOps
 
-from .animated_parsers import parse_avif_duration, parse_webp_duration
+from .animated_parsers import parse_avif_duration, parse_gif_duration, parse_webp_duration
 from .thumbhash import rgba_to_thumb_hash
 
 # Type alias for metadata dictionary using Python 3.11 compatible syntax
@@ -26,6 +25,10 @@ ANIMATED_IMAGE_FORMATS: Final[list[AnimatedImageFormat]] = [
 
 logger = logging.getLogger(__name__)
 
+# Enable loading of truncated images. This is a process-wide Pillow setting,
+# so it's set once here rather than on every extract_image_metadata() call.
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+
 
 def extract_image_metadata(file_path: str, mime_type: str) -> tuple[FileMetadata, bool]:
     """Extract metadata from image files using ONLY Pillow.
@@ -41,9 +44,6 @@ def extract_image_metadata(file_path: str, mime_type: str) -> tuple[FileMetadata
     metadata: FileMetadata = {}
     is_corrupt = False
 
-    # Enable loading of truncated images
-    ImageFile.LOAD_TRUNCATED_IMAGES = True
-
     try:
         # Open image once for all operations
         with Image.open(file_path) as img:
@@ -58,7 +58,7 @@ def extract_image_metadata(file_path: str, mime_type: str) -> tuple[FileMetadata
                 return metadata, True
 
             # Generate thumbhash
-            thumbhash = _generate_thumbhash(file_path)
+            thumbhash = _generate_thumbhash(img)
             if thumbhash:
                 image_info["thumbhash"] = thumbhash
             else:
@@ -67,7 +67,7 @@ def extract_image_metadata(file_path: str, mime_type: str) -> tuple[FileMetadata
 
             # Check for animation and extract duration
             if mime_type in ANIMATED_IMAGE_FORMATS:
-                duration_ms = _extract_animated_duration(img, file_path, mime_type)
+                duration_ms = _extract_animated_duration(file_path, mime_type)
                 if duration_ms and duration_ms > 0:
                     metadata["duration"] = duration_ms
                     image_info["animated"] = True
@@ -91,36 +91,35 @@ def extract_image_metadata(file_path: str, mime_type: str) -> tuple[FileMetadata
     return metadata, is_corrupt
 
 
-def _generate_thumbhash(file_path: str) -> str | None:
-    """Generate thumbhash from image file path.
+def _generate_thumbhash(img: Image.Image) -> str | None:
+    """Generate thumbhash from an already opened image.
 
     Args:
-        file_path: Path to the image file
+        img: PIL Image object (must be opened), left unmodified
 
     Returns:
         Hex string of thumbhash or None on error
     """
     try:
-        with Image.open(file_path) as img:
-            img = img.convert("RGBA")
-            img.thumbnail(THUMBHASH_MAX_SIZE)
-            img = ImageOps.exif_transpose(img)
-            rgba = list(chain.from_iterable(img.get_flattened_data()))
-            thumb_hash = rgba_to_thumb_hash(img.width, img.height, rgba)
-            return bytes(thumb_hash).hex()
+        # convert() returns a new image, so the caller's image isn't resized
+        img = img.convert("RGBA")
+        img.thumbnail(THUMBHASH_MAX_SIZE)
+        img = ImageOps.exif_transpose(img)
+        # Packed RGBA bytes index as ints, no need for a list of per-pixel tuples
+        thumb_hash = rgba_to_thumb_hash(img.width, img.height, img.tobytes())
+        return bytes(thumb_hash).hex()
     except Exception as e:
         logger.error(f"Failed to generate thumbhash: {e}")
         return None
 
 
-def _extract_animated_duration(img: Image.Image, file_path: str, mime_type: str) -> int | None:
+def _extract_animated_duration(file_path: str, mime_type: str) -> int | None:
     """Extract total duration from animated image.
 
-    Uses custom parsers for AVIF and WebP (where Pillow doesn't provide duration),
-    falls back to Pillow for GIF.
+    Uses custom parsers for AVIF and WebP (where Pillow doesn't provide duration)
+    and for GIF (where Pillow would decode every frame to get at each delay).
 
     Args:
-        img: PIL Image object (must be opened)
         file_path: Path to the image file
         mime_type: MIME type of the image
 
@@ -128,14 +127,13 @@ def _extract_animated_duration(img: Image.Image, file_path: str, mime_type: str)
         Total duration in milliseconds or None if not animated/error
     """
     try:
-        # Use custom parsers for AVIF and WebP (Pillow doesn't provide duration)
+        # Pillow doesn't provide duration for AVIF and WebP, and is slow for GIF
         if mime_type == "image/avif":
             return parse_avif_duration(file_path)
         elif mime_type == "image/webp":
             return parse_webp_duration(file_path)
         elif mime_type == "image/gif":
-            # Use Pillow for GIF (it works correctly)
-            return _extract_gif_duration_with_pillow(img)
+            return parse_gif_duration(file_path)
         else:
             logger.warning(f"Unknown animated format: {mime_type}")
             return None
@@ -143,58 +141,3 @@ def _extract_animated_duration(img: Image.Image, file_path: str, mime_type: str)
     except Exception as e:
         logger.error(f"Failed to extract animated duration from {file_path}: {e}")
         return None
-
-
-def _extract_gif_duration_with_pillow(img: Image.Image) -> int | None:
-    """Extract total duration from GIF using Pillow (works correctly for GIF).
-
-    Args:
-        img: PIL Image object (must be opened)
-
-    Returns:
-        Total duration in milliseconds or None if not animated/error
-    """
-    try:
-        # Check if image has multiple frames
-        if not hasattr(img, "seek"):
-            return None
-
-        total_duration = 0
-        frame_count = 0
-
-        # Start from beginning
-        img.seek(0)
-
-        while True:
-            try:
-                # Get frame duration in milliseconds
-                # For GIF, Pillow provides this correctly
-                frame_duration = img.info.get("duration")
-                if frame_duration is None:
-                    logger.warning("GIF frame missing duration, skipping")
-                    break
-
-                total_duration += frame_duration
-                frame_count += 1
-
-                # Move to next frame
-                img.seek(img.tell() + 1)
-            except EOFError:
-                # End of animation reached
-                break
-            except Exception:
-                # Error seeking to next frame
-                break
-
-        # Return to first frame
-        img.seek(0)
-
-        # Only return duration if we found multiple frames
-        if frame_count > 1 and total_duration > 0:
-            return total_duration
-        else:
-            return None
-
-    except Exception as e:
-        logger.error(f"Failed to extract GIF duration with Pillow: {e}")
-        return None
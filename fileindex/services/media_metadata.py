@@ -1,22 +1,29 @@
 """Service for extracting metadata from video and audio files using ffprobe and MediaInfo."""
 
+import functools
 import logging
+import os
 from contextlib import suppress
 from typing import Any
 
-from fileindex.services import ffprobe
+from fileindex.services import ffprobe, mediainfo_analysis
 
 # Type alias for metadata dictionary using Python 3.11 compatible syntax
 FileMetadata = dict[str, Any]
 
 logger = logging.getLogger(__name__)
 
+# (metadata key, ffprobe stream field) pairs copied as-is from each stream
+_VIDEO_FIELDS = (("codec", "codec_name"), ("width", "width"), ("height", "height"))
+_AUDIO_FIELDS = (("codec", "codec_name"), ("channels", "channels"))
 
-def extract_video_metadata(file_path: str) -> tuple[FileMetadata, bool]:
+
+def extract_video_metadata(file_path: str, stat: os.stat_result | None = None) -> tuple[FileMetadata, bool]:
     """Extract metadata from video files using ffprobe and MediaInfo.
 
     Args:
         file_path: Path to the video file.
+        stat: os.stat() result for file_path, if the caller already has one.
 
     Returns:
         Tuple of (metadata dict, is_corrupt flag).
@@ -26,7 +33,7 @@ def extract_video_metadata(file_path: str) -> tuple[FileMetadata, bool]:
 
     try:
         # Call ffprobe once and get all data
-        ffprobe_data = ffprobe.run_ffprobe(file_path)
+        ffprobe_data = ffprobe.run_ffprobe(file_path, stat=stat)
         if not ffprobe_data:
             logger.warning(f"ffprobe failed for video file {file_path}")
             return {}, True
@@ -78,11 +85,12 @@ def extract_video_metadata(file_path: str) -> tuple[FileMetadata, bool]:
     return metadata, is_corrupt
 
 
-def extract_audio_metadata(file_path: str) -> tuple[FileMetadata, bool]:
+def extract_audio_metadata(file_path: str, stat: os.stat_result | None = None) -> tuple[FileMetadata, bool]:
     """Extract metadata from audio files using ffprobe and MediaInfo.
 
     Args:
         file_path: Path to the audio file.
+        stat: os.stat() result for file_path, if the caller already has one.
 
     Returns:
         Tuple of (metadata dict, is_corrupt flag).
@@ -92,7 +100,7 @@ def extract_audio_metadata(file_path: str) -> tuple[FileMetadata, bool]:
 
     try:
         # Call ffprobe once and get all data
-        ffprobe_data = ffprobe.run_ffprobe(file_path)
+        ffprobe_data = ffprobe.run_ffprobe(file_path, stat=stat)
         if not ffprobe_data:
             logger.warning(f"ffprobe failed for audio file {file_path}")
             return {}, True
@@ -128,6 +136,46 @@ def extract_audio_metadata(file_path: str) -> tuple[FileMetadata, bool]:
     return metadata, is_corrupt
 
 
+@functools.lru_cache(maxsize=64)
+def _parse_frame_rate(r_frame_rate: str) -> float | None:
+    """Parse an ffprobe frame rate like "30000/1001".
+
+    Cached because nearly every file uses one of a handful of rates.
+
+    Args:
+        r_frame_rate: Frame rate as a "numerator/denominator" string
+
+    Returns:
+        Frames per second, or None if it can't be parsed or the denominator is 0
+    """
+    if "/" not in r_frame_rate:
+        return None
+    try:
+        num, den = r_frame_rate.split("/")
+        if int(den) != 0:
+            return float(num) / float(den)
+    except (ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+def _index_streams(data: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Map each codec type in ffprobe JSON data to its first stream.
+
+    Args:
+        data: Parsed JSON output from ffprobe
+
+    Returns:
+        Dictionary like {"video": {...}, "audio": {...}}
+    """
+    streams: dict[str, dict[str, Any]] = {}
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type and codec_type not in streams:
+            streams[codec_type] = stream
+    return streams
+
+
 def _extract_video_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -> dict[str, Any]:
     """Extract video metadata from ffprobe JSON data.
 
@@ -141,20 +189,13 @@ def _extract_video_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -
     metadata = {}
 
     # Find video and audio streams
-    video_stream = None
-    audio_stream = None
-    for stream in data.get("streams", []):
-        if stream.get("codec_type") == "video" and not video_stream:
-            video_stream = stream
-        elif stream.get("codec_type") == "audio" and not audio_stream:
-            audio_stream = stream
+    streams = _index_streams(data)
+    video_stream = streams.get("video")
+    audio_stream = streams.get("audio")
 
     # Extract video information
     if video_stream:
-        video_info = {}
-        video_info["codec"] = video_stream.get("codec_name")
-        video_info["width"] = video_stream.get("width")
-        video_info["height"] = video_stream.get("height")
+        video_info = {key: video_stream.get(field) for key, field in _VIDEO_FIELDS}
 
         # Video bitrate
         if video_bitrate := video_stream.get("bit_rate"):
@@ -164,21 +205,14 @@ def _extract_video_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -
                 pass
 
         # Parse frame rate
-        r_frame_rate = video_stream.get("r_frame_rate", "0/1")
-        if "/" in r_frame_rate:
-            try:
-                num, den = r_frame_rate.split("/")
-                if int(den) != 0:
-                    video_info["frame_rate"] = float(num) / float(den)
-            except (ValueError, ZeroDivisionError):
-                pass
+        if (frame_rate := _parse_frame_rate(video_stream.get("r_frame_rate", "0/1"))) is not None:
+            video_info["frame_rate"] = frame_rate
 
         metadata["video"] = video_info
 
     # Extract audio information
     if audio_stream:
-        audio_info = {}
-        audio_info["codec"] = audio_stream.get("codec_name")
+        audio_info = {key: audio_stream.get(field) for key, field in _AUDIO_FIELDS}
 
         if audio_bitrate := audio_stream.get("bit_rate"):
             try:
@@ -192,8 +226,6 @@ def _extract_video_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -
             except (ValueError, TypeError):
                 pass
 
-        audio_info["channels"] = audio_stream.get("channels")
-
         metadata["audio"] = audio_info
 
     # Get duration from format or streams (convert to milliseconds)
@@ -228,15 +260,10 @@ def _extract_audio_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -
     metadata = {}
 
     # Find audio stream
-    audio_stream = None
-    for stream in data.get("streams", []):
-        if stream.get("codec_type") == "audio":
-            audio_stream = stream
-            break
+    audio_stream = _index_streams(data).get("audio")
 
     if audio_stream:
-        audio_info = {}
-        audio_info["codec"] = audio_stream.get("codec_name")
+        audio_info = {key: audio_stream.get(field) for key, field in _AUDIO_FIELDS}
 
         # Basic audio properties
         with suppress(ValueError, TypeError):
@@ -244,8 +271,6 @@ def _extract_audio_metadata_from_ffprobe(data: dict[str, Any], file_path: str) -
             if sample_rate:
                 audio_info["sample_rate"] = int(sample_rate)
 
-        audio_info["channels"] = audio_stream.get("channels")
-
         # Get bitrate from stream or format
         bitrate = audio_stream.get("bit_rate")
         if not bitrate and "format" in data:
@@ -295,8 +320,6 @@ def _extract_mediainfo_metadata(file_path: str) -> dict[str, Any] | None:
         Filtered MediaInfo metadata dict or None if unavailable
     """
     try:
-        from fileindex.services import mediainfo_analysis
-
         mediainfo_data = mediainfo_analysis.extract_filtered_mediainfo_metadata(file_path)
         # Return data if it has more than just version info
         if mediainfo_data and len(mediainfo_data) > 1:
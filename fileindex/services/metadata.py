@@ -1,6 +1,7 @@
 """Service for routing metadata extraction to specialized services."""
 
 import logging
+import os
 from typing import Any
 
 from fileindex.services import image_metadata, media_metadata
@@ -11,7 +12,9 @@ FileMetadata = dict[str, Any]
 logger = logging.getLogger(__name__)
 
 
-def extract_metadata(file_path: str, mime_type: str | None = None) -> tuple[FileMetadata, bool]:
+def extract_metadata(
+    file_path: str, mime_type: str | None = None, stat: os.stat_result | None = None
+) -> tuple[FileMetadata, bool]:
     """Extract metadata from media files.
 
     This is the main entry point for metadata extraction. It determines the file type
@@ -20,6 +23,7 @@ def extract_metadata(file_path: str, mime_type: str | None = None) -> tuple[File
     Args:
         file_path: Path to the media file
         mime_type: MIME type of the file (auto-detected if None)
+        stat: os.stat() result for file_path, if the caller already has one
 
     Returns:
         A tuple of (metadata dict, is_corrupt flag).
@@ -36,9 +40,9 @@ def extract_metadata(file_path: str, mime_type: str | None = None) -> tuple[File
         if mime_type and mime_type.startswith("image/"):
             return image_metadata.extract_image_metadata(file_path, mime_type)
         elif mime_type and mime_type.startswith("video/"):
-            return media_metadata.extract_video_metadata(file_path)
+            return media_metadata.extract_video_metadata(file_path, stat=stat)
         elif mime_type and mime_type.startswith("audio/"):
-            return media_metadata.extract_audio_metadata(file_path)
+            return media_metadata.extract_audio_metadata(file_path, stat=stat)
         else:
             # No metadata extraction needed for other file types
             return {}, False
@@ -7,15 +7,17 @@ Only the rgba_to_thumb_hash() encoder is included — pure math, no Pillow depen
 """
 
 import math
+from collections.abc import Sequence
 
 
-def rgba_to_thumb_hash(w: int, h: int, rgba: list[int]) -> list[int]:
+def rgba_to_thumb_hash(w: int, h: int, rgba: Sequence[int]) -> list[int]:
     """Encode an RGBA image to a ThumbHash.
 
     Args:
         w: Image width (max 100).
         h: Image height (max 100).
-        rgba: Flattened RGBA pixel values (length = w * h * 4).
+        rgba: Flattened RGBA pixel values (length = w * h * 4), e.g. the bytes
+            from Image.tobytes() of an RGBA image.
 
     Returns:
         List of integers representing the ThumbHash.
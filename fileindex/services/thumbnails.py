@@ -1,55 +1,86 @@
 """Service for generating thumbnails from video files."""
 
-import contextlib
 import logging
 import subprocess
 import tempfile
-from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# ffmpeg output options for a single JPEG frame, shared by every thumbnail call
+_THUMBNAIL_OUTPUT_ARGS = (
+    "-vframes",
+    "1",  # Extract 1 frame
+    "-q:v",
+    "2",  # High quality
+    "-f",
+    "image2pipe",
+    "-vcodec",
+    "mjpeg",
+    "-",  # Write to stdout
+)
 
-def generate_video_thumbnail(video_path: str, seek_time: str = "00:00:00.5") -> str | None:
-    """Generate thumbnail from video using ffmpeg.
+
+def generate_video_thumbnail_bytes(video_path: str, seek_time: str = "00:00:00.5") -> bytes | None:
+    """Generate a JPEG thumbnail from video using ffmpeg, without touching disk.
+
+    ffmpeg writes the frame to a pipe instead of a temporary file. It seeks
+    the input to the nearest keyframe before seek_time and decodes only from
+    there, so late seek times stay cheap. The frame is still exact because
+    ffmpeg discards the decoded frames before seek_time (accurate_seek).
 
     Args:
         video_path: Path to the video file
         seek_time: Time to seek to for thumbnail (default: 0.5 seconds)
 
     Returns:
-        Path to generated thumbnail file or None on error
-        Caller is responsible for cleaning up the returned file
+        JPEG bytes or None on error
     """
     try:
-        # Create temporary thumbnail file
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
-            thumbnail_path = tmp.name
-
         cmd = [
             "ffmpeg",
+            "-ss",
+            seek_time,  # Before -i, so ffmpeg seeks the input instead of decoding up to it
             "-i",
             video_path,
-            "-ss",
-            seek_time,
-            "-vframes",
-            "1",  # Extract 1 frame
-            "-q:v",
-            "2",  # High quality
-            "-y",  # Overwrite output file
-            thumbnail_path,
+            *_THUMBNAIL_OUTPUT_ARGS,
         ]
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(cmd, capture_output=True, timeout=30)
 
-        if result.returncode == 0 and Path(thumbnail_path).exists():
-            return thumbnail_path
+        if result.returncode == 0 and result.stdout:
+            return result.stdout
         else:
-            logger.error(f"ffmpeg thumbnail generation failed: {result.stderr}")
-            # Clean up failed thumbnail file
-            with contextlib.suppress(OSError):
-                Path(thumbnail_path).unlink()
+            stderr = result.stderr.decode(errors="replace")
+            logger.error(f"ffmpeg thumbnail generation failed: {stderr}")
             return None
 
     except (subprocess.SubprocessError, subprocess.TimeoutExpired, OSError) as e:
         logger.error(f"Error generating video thumbnail: {e}")
         return None
+
+
+def generate_video_thumbnail(video_path: str, seek_time: str = "00:00:00.5") -> str | None:
+    """Generate thumbnail from video using ffmpeg.
+
+    Prefer generate_video_thumbnail_bytes() when the thumbnail doesn't need
+    to be a file.
+
+    Args:
+        video_path: Path to the video file
+        seek_time: Time to seek to for thumbnail (default: 0.5 seconds)
+
+    Returns:
+        Path to generated thumbnail file or None on error
+        Caller is responsible for cleaning up the returned file
+    """
+    thumbnail = generate_video_thumbnail_bytes(video_path, seek_time)
+    if thumbnail is None:
+        return None
+
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
+            tmp.write(thumbnail)
+            return tmp.name
+    except OSError as e:
+        logger.error(f"Error writing video thumbnail: {e}")
+        return None
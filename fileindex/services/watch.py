@@ -6,13 +6,14 @@ and automatically importing new files as they are created or modified.
 """
 
 import logging
+import threading
 from collections.abc import Callable
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers.polling import PollingObserver
 
 from fileindex.exceptions import ImportErrorType
-from fileindex.services.file_import import import_directory, import_file
+from fileindex.services.file_import import ImportWorkerPool, import_directory, import_file
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +62,23 @@ class WatchEventHandler(FileSystemEventHandler):
             self.callback(event.dest_path)
 
 
+class _NotifyingPollingObserver(PollingObserver):
+    """
+    PollingObserver that calls on_exit from its thread when the thread ends,
+    whether it was stopped or died.
+    """
+
+    def __init__(self, on_exit: Callable[["_NotifyingPollingObserver"], None], **kwargs):
+        super().__init__(**kwargs)
+        self.on_exit = on_exit
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self.on_exit(self)
+
+
 class DirectoryWatcher:
     """
     Service for watching directories and importing files.
@@ -74,6 +92,7 @@ class DirectoryWatcher:
         validate: bool = True,
         file_event_callback: Callable[[str, bool, str], None] | None = None,
         import_progress_callback: Callable[[str, bool, str | None], None] | None = None,
+        max_workers: int = 4,
     ):
         """
         Initialize the directory watcher.
@@ -85,6 +104,7 @@ class DirectoryWatcher:
             validate: Validate files before importing
             file_event_callback: Callback for file events (filepath, success, message)
             import_progress_callback: Callback for initial import progress (filepath, success)
+            max_workers: Number of threads importing files while watching
         """
         self.paths = paths
         self.delete_after = delete_after
@@ -92,7 +112,10 @@ class DirectoryWatcher:
         self.validate = validate
         self.file_event_callback = file_event_callback
         self.import_progress_callback = import_progress_callback
+        self.max_workers = max_workers
         self.observer = None
+        self._executor = None
+        self._stop_requested = threading.Event()
 
     def import_existing_files(self) -> dict[str, dict]:
         """
@@ -152,6 +175,17 @@ class DirectoryWatcher:
         else:
             logger.info(f"{'Created' if created else 'Found existing'} IndexedFile for: {filepath}")
 
+    def _queue_file_event(self, filepath: str):
+        """Import the file on a worker thread so the observer thread keeps draining events."""
+        self._executor.submit(self._handle_queued_file_event, filepath)
+
+    def _handle_queued_file_event(self, filepath: str):
+        try:
+            self.handle_file_event(filepath)
+        except Exception:
+            # Nobody waits on the future, so make sure the failure is visible
+            logger.exception(f"Unhandled error processing file event: {filepath}")
+
     def start_watching(self) -> PollingObserver:
         """
         Start watching the configured directories.
@@ -163,11 +197,16 @@ class DirectoryWatcher:
             logger.warning("Observer is already running")
             return self.observer
 
+        # Hashing a large file can take a while, so imports run on a pool
+        # instead of blocking the observer thread. Each worker keeps one
+        # database connection, closed when watching stops.
+        self._executor = ImportWorkerPool(max_workers=self.max_workers, thread_name_prefix="fileindex-watch")
+
         # Create event handler
-        event_handler = WatchEventHandler(self.handle_file_event)
+        event_handler = WatchEventHandler(self._queue_file_event)
 
         # Create and configure observer
-        self.observer = PollingObserver()
+        self.observer = _NotifyingPollingObserver(self._observer_exited)
 
         for path in self.paths:
             logger.info(f"Starting watch on: {path}")
@@ -179,8 +218,17 @@ class DirectoryWatcher:
 
         return self.observer
 
+    def _observer_exited(self, observer: _NotifyingPollingObserver):
+        """Called from the observer thread as it ends."""
+        if not observer.stopped_event.is_set():
+            logger.warning("Observer thread stopped unexpectedly")
+        # Wake up watch_and_wait, there is nothing left to wait for
+        self._stop_requested.set()
+
     def stop_watching(self):
         """Stop watching directories."""
+        # Wake up watch_and_wait, which may be blocked in another thread
+        self._stop_requested.set()
         if self.observer and self.observer.is_alive():
             logger.info("Stopping directory watcher...")
             self.observer.stop()
@@ -189,19 +237,30 @@ class DirectoryWatcher:
         else:
             logger.warning("Observer is not running")
 
+        if self._executor:
+            # Let imports that already started finish, then close their connections
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def watch_and_wait(self):
         """
         Start watching and wait until interrupted.
 
         This is a convenience method that starts watching and blocks
-        until a KeyboardInterrupt is received.
+        until a KeyboardInterrupt is received, stop_watching() is called
+        (including before this starts), or the observer thread dies.
+
+        The wait has no timeout, so an idle watcher never wakes up: both
+        stop_watching() and the observer thread ending set the stop event.
+        On POSIX, Ctrl-C still interrupts the wait.
         """
-        observer = self.start_watching()
+        self.start_watching()
 
         try:
-            while observer.is_alive():
-                observer.join(1)
+            self._stop_requested.wait()
         except KeyboardInterrupt:
             logger.info("Received interrupt signal")
         finally:
             self.stop_watching()
+            # The stop request has been handled, so the watcher can be restarted
+            self._stop_requested.clear()
@@ -4,7 +4,7 @@ from pathlib import Path
 
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Prefetch, Q
+from django.db.models import Count, Prefetch, Q
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_list_or_404, redirect, render
 from django.utils import timezone
@@ -186,28 +186,21 @@ class FilesWithoutMetadataView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Add summary statistics
-        total_without_metadata = IndexedFile.objects.filter(Q(metadata={}) | Q(metadata__isnull=True)).count()
-
-        # Breakdown by type
-        images_without = IndexedFile.objects.filter(
-            Q(metadata={}) | Q(metadata__isnull=True), mime_type__startswith="image/"
-        ).count()
-
-        videos_without = IndexedFile.objects.filter(
-            Q(metadata={}) | Q(metadata__isnull=True), mime_type__startswith="video/"
-        ).count()
-
-        audio_without = IndexedFile.objects.filter(
-            Q(metadata={}) | Q(metadata__isnull=True), mime_type__startswith="audio/"
-        ).count()
+        # Add summary statistics, with the breakdown by type counted in the
+        # same scan as the total
+        counts = IndexedFile.objects.filter(Q(metadata={}) | Q(metadata__isnull=True)).aggregate(
+            total=Count("pk"),
+            images=Count("pk", filter=Q(mime_type__startswith="image/")),
+            videos=Count("pk", filter=Q(mime_type__startswith="video/")),
+            audio=Count("pk", filter=Q(mime_type__startswith="audio/")),
+        )
 
         context.update(
             {
-                "total_without_metadata": total_without_metadata,
-                "images_without_metadata": images_without,
-                "videos_without_metadata": videos_without,
-                "audio_without_metadata": audio_without,
+                "total_without_metadata": counts["total"],
+                "images_without_metadata": counts["images"],
+                "videos_without_metadata": counts["videos"],
+                "audio_without_metadata": counts["audio"],
                 "current_filter": self.request.GET.get("mime", ""),
             }
         )
@@ -252,30 +245,25 @@ class VideoMetadataIssuesView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Add video statistics
-        total_videos = IndexedFile.objects.filter(mime_type__startswith="video/").count()
-        videos_with_complete_metadata = (
-            IndexedFile.objects.filter(
-                mime_type__startswith="video/",
-                metadata__duration__isnull=False,
-                metadata__width__isnull=False,
-                metadata__height__isnull=False,
-                metadata__frame_rate__isnull=False,
-            )
-            .exclude(metadata={})
-            .count()
+        # Add video statistics, all counted in a single scan of the videos
+        complete_metadata = Q(
+            metadata__duration__isnull=False,
+            metadata__width__isnull=False,
+            metadata__height__isnull=False,
+            metadata__frame_rate__isnull=False,
+        ) & ~Q(metadata={})
+        counts = IndexedFile.objects.filter(mime_type__startswith="video/").aggregate(
+            total=Count("pk"),
+            complete=Count("pk", filter=complete_metadata),
+            missing_duration=Count("pk", filter=Q(metadata__duration__isnull=True)),
         )
 
-        videos_missing_duration = IndexedFile.objects.filter(
-            mime_type__startswith="video/", metadata__duration__isnull=True
-        ).count()
-
         context.update(
             {
-                "total_videos": total_videos,
-                "videos_with_complete_metadata": videos_with_complete_metadata,
-                "videos_with_issues": total_videos - videos_with_complete_metadata,
-                "videos_missing_duration": videos_missing_duration,
+                "total_videos": counts["total"],
+                "videos_with_complete_metadata": counts["complete"],
+                "videos_with_issues": counts["total"] - counts["complete"],
+                "videos_missing_duration": counts["missing_duration"],
             }
         )
 
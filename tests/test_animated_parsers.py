@@ -1,10 +1,11 @@
 """Tests for custom animated image duration parsers."""
 
+import struct
 from pathlib import Path
 
 import pytest
 
-from fileindex.services.animated_parsers import parse_avif_duration, parse_webp_duration
+from fileindex.services.animated_parsers import parse_avif_duration, parse_gif_duration, parse_webp_duration
 from fileindex.services.image_metadata import extract_image_metadata
 
 
@@ -18,6 +19,7 @@ class TestAnimatedParsers:
             ("test_1.5sec.avif", 1500, parse_avif_duration),
             ("animated.webp", 840, parse_webp_duration),
             ("test_2sec.webp", 2000, parse_webp_duration),
+            ("test_3sec.gif", 3000, parse_gif_duration),
         ],
     )
     def test_custom_parsers_on_sample_files(self, filename, expected_duration_ms, parser_func):
@@ -111,6 +113,36 @@ class TestAnimatedParsers:
         result = parse_avif_duration(str(invalid_file))
         assert result is None
 
+    def test_avif_parser_ignores_mvhd_bytes_outside_moov(self, tmp_path):
+        """Test that b"mvhd" inside image data isn't mistaken for a movie header."""
+
+        def box(box_type, payload):
+            return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+        # Version 0 mvhd-looking bytes: timescale 1000, duration 5000
+        fake_mvhd = b"mvhd" + b"\x00" * 12 + struct.pack(">II", 1000, 5000)
+        static_file = tmp_path / "static.avif"
+        static_file.write_bytes(box(b"ftyp", b"avif\x00\x00\x00\x00avif") + box(b"mdat", fake_mvhd))
+
+        result = parse_avif_duration(str(static_file))
+        assert result is None
+
+    def test_avif_parser_finds_mvhd_inside_moov(self, tmp_path):
+        """Test that the box walker reaches moov/mvhd past other top-level boxes."""
+
+        def box(box_type, payload):
+            return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+        # Version 0 mvhd: version/flags, creation and modification times, timescale, duration
+        mvhd = box(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, 2500))
+        animated_file = tmp_path / "animated.avif"
+        animated_file.write_bytes(
+            box(b"ftyp", b"avis\x00\x00\x00\x00avis") + box(b"mdat", b"\xff" * 64) + box(b"moov", mvhd)
+        )
+
+        result = parse_avif_duration(str(animated_file))
+        assert result == 2500
+
     def test_webp_parser_with_invalid_file(self, tmp_path):
         """Test WebP parser handles invalid files gracefully."""
         invalid_file = tmp_path / "invalid.webp"
@@ -119,6 +151,40 @@ class TestAnimatedParsers:
         result = parse_webp_duration(str(invalid_file))
         assert result is None
 
+    def test_webp_parser_stops_at_frame_limit(self, tmp_path, monkeypatch, caplog):
+        """Test that frame parsing is capped so huge or looping files stay cheap."""
+        monkeypatch.setattr("fileindex.services.animated_parsers.WEBP_MAX_FRAMES", 3)
+
+        # 16-byte ANMF payload with a 100ms duration at bytes 12-14
+        anmf = b"ANMF" + struct.pack("<I", 16) + b"\x00" * 12 + (100).to_bytes(3, "little") + b"\x00"
+        body = b"WEBP" + anmf * 5
+        webp_file = tmp_path / "many_frames.webp"
+        webp_file.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+        with caplog.at_level("WARNING", logger="fileindex.services.animated_parsers"):
+            result = parse_webp_duration(str(webp_file))
+
+        assert result == 300
+        assert "frame limit" in caplog.text
+
+    def test_gif_parser_with_invalid_file(self, tmp_path):
+        """Test GIF parser handles invalid files gracefully."""
+        invalid_file = tmp_path / "invalid.gif"
+        invalid_file.write_text("not a gif file")
+
+        result = parse_gif_duration(str(invalid_file))
+        assert result is None
+
+    def test_gif_parser_matches_pillow_frame_delays(self, tmp_path):
+        """Test that walking the GIF blocks sums the same delays Pillow reports."""
+        from PIL import Image
+
+        frames = [Image.new("RGB", (16, 16), color) for color in ("red", "green", "blue", "white")]
+        gif_file = tmp_path / "frames.gif"
+        frames[0].save(gif_file, save_all=True, append_images=frames[1:], duration=[100, 250, 40, 70], loop=0)
+
+        assert parse_gif_duration(str(gif_file)) == 460
+
     def test_parsers_reject_static_images(self):
         """Test that parsers return None for static (non-animated) images if any exist."""
         # This test documents that the parsers should return None for static images
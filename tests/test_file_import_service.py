@@ -4,12 +4,14 @@ Tests for the file import service module.
 
 import os
 import tempfile
+import threading
 from unittest.mock import Mock, patch
 
 import pytest
 
 from fileindex.exceptions import ImportErrorType
 from fileindex.services.file_import import (
+    ImportWorkerPool,
     batch_import_files,
     find_importable_files,
     import_directory,
@@ -207,7 +209,7 @@ def test_import_directory_with_validation_failures(temp_test_dir):
     """Test importing directory with some files failing validation."""
     temp_dir, test_files = temp_test_dir
 
-    def mock_should_import(filepath):
+    def mock_should_import(filepath, entry=None):
         # Only accept files with '1' in the name
         return "1" in os.path.basename(filepath)
 
@@ -247,6 +249,160 @@ def test_import_directory_with_progress_callback(temp_test_dir):
             assert all(success for _, success, _ in progress_calls)
 
 
+@pytest.mark.django_db
+def test_import_directory_with_workers(temp_test_dir):
+    """Test that importing on several threads gives the same stats and order."""
+    temp_dir, test_files = temp_test_dir
+    progress_calls = []
+
+    def progress_callback(filepath, success, error_msg):
+        progress_calls.append(filepath)
+
+    with patch("fileindex.models.IndexedFile.objects.get_or_create_from_file") as mock_create:
+        mock_indexed_file = Mock()
+        mock_indexed_file.sha512 = "abcdef1234567890" * 4
+        mock_create.return_value = (mock_indexed_file, True)
+
+        with patch("fileindex.services.file_import.should_import", return_value=True):
+            stats = import_directory(temp_dir, recursive=True, progress_callback=progress_callback, max_workers=3)
+
+            assert stats["total_files"] == 4
+            assert stats["imported"] == 4
+            assert stats["created"] == 4
+            assert mock_create.call_count == 4
+            assert progress_calls == sorted(test_files[:3]) + [test_files[3]]
+
+
+def test_import_worker_pool_closes_worker_connections():
+    """Test that each worker keeps one connection, closed when the pool shuts down."""
+    mock_connection = Mock()
+
+    with patch("fileindex.services.file_import.connections", {"default": mock_connection}):
+        with ImportWorkerPool(max_workers=1) as pool:
+            assert list(pool.map(str, [1, 2])) == ["1", "2"]
+            mock_connection.close.assert_not_called()
+
+    mock_connection.inc_thread_sharing.assert_called_once()
+    mock_connection.close.assert_called_once()
+    mock_connection.dec_thread_sharing.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_batch_import_files_stop_on_error_with_workers(temp_test_dir):
+    """Test that stop_on_error stops a threaded batch import at the first failure."""
+    temp_dir, test_files = temp_test_dir
+
+    with patch(
+        "fileindex.models.IndexedFile.objects.get_or_create_from_file", side_effect=Exception("boom")
+    ) as mock_create:
+        with patch("fileindex.services.file_import.should_import", return_value=True):
+            stats = batch_import_files(test_files, stop_on_error=True, max_workers=2)
+
+            assert stats["imported"] == 0
+            assert list(stats["errors"])[0] == test_files[0]
+            # Every file that was attempted is reported, the rest were never started
+            assert sorted(stats["errors"]) == sorted(call.args[0] for call in mock_create.call_args_list)
+
+
+@pytest.mark.django_db
+def test_batch_import_files_stop_on_error_reports_imports_under_way(temp_test_dir):
+    """Test that files imported on other workers while stopping are still counted."""
+    temp_dir, test_files = temp_test_dir
+    second_started = threading.Event()
+
+    def fake_create(filepath, **kwargs):
+        if filepath == test_files[0]:
+            # Fail only once the second file is being imported on the other worker
+            second_started.wait(timeout=5)
+            raise Exception("boom")
+        if filepath == test_files[1]:
+            second_started.set()
+        return Mock(sha512="abcdef1234567890" * 4), True
+
+    with (
+        patch("fileindex.models.IndexedFile.objects.get_or_create_from_file", side_effect=fake_create) as mock_create,
+        patch("fileindex.services.file_import.should_import", return_value=True),
+    ):
+        stats = batch_import_files(test_files, stop_on_error=True, max_workers=2)
+
+    assert list(stats["errors"]) == [test_files[0]]
+    assert stats["imported"] >= 1
+    assert stats["imported"] + len(stats["errors"]) == mock_create.call_count
+
+
+@pytest.mark.django_db
+def test_import_directory_in_batches(temp_test_dir):
+    """Test that batch_size indexes validated files through get_or_create_from_files."""
+    temp_dir, test_files = temp_test_dir
+
+    def mock_should_import(filepath, entry=None):
+        return "1" not in os.path.basename(filepath)
+
+    def fake_bulk(filepaths, only_hard_link=False, max_workers=4):
+        return [(Mock(sha512="abcdef1234567890" * 4), True) for _ in filepaths]
+
+    with patch("fileindex.models.IndexedFile.objects.get_or_create_from_files", side_effect=fake_bulk) as mock_bulk:
+        with patch("fileindex.services.file_import.should_import", side_effect=mock_should_import):
+            stats = import_directory(temp_dir, recursive=True, batch_size=2)
+
+            assert stats["total_files"] == 4
+            assert stats["imported"] == 3
+            assert stats["created"] == 3
+            assert stats["skipped"] == 1
+            assert [call.args[0] for call in mock_bulk.call_args_list] == [
+                [test_files[0]],
+                [test_files[2], test_files[3]],
+            ]
+
+
+@pytest.mark.django_db
+def test_batch_import_files_in_batches_falls_back_per_file(temp_test_dir):
+    """Test that a failing batch is retried file by file so errors are per file."""
+    temp_dir, test_files = temp_test_dir
+
+    def fake_create(filepath, **kwargs):
+        if filepath == test_files[1]:
+            raise Exception("boom")
+        return Mock(sha512="abcdef1234567890" * 4), True
+
+    with (
+        patch("fileindex.models.IndexedFile.objects.get_or_create_from_files", side_effect=Exception("boom")),
+        patch("fileindex.models.IndexedFile.objects.get_or_create_from_file", side_effect=fake_create),
+        patch("fileindex.services.file_import.should_import", return_value=True),
+    ):
+        stats = batch_import_files(test_files, batch_size=10)
+
+        assert stats["imported"] == 3
+        assert list(stats["errors"]) == [test_files[1]]
+
+
+@pytest.mark.django_db
+def test_batch_import_files_retry_reports_new_files_as_created(temp_test_dir):
+    """Test that files from a failed batch are still reported as created when retried."""
+    from fileindex import fileutils
+    from fileindex.models import IndexedFile
+
+    temp_dir, test_files = temp_test_dir
+    smartadd = fileutils.smartadd
+    failures = iter([Exception("disk hiccup")])
+
+    def flaky_smartadd(src, dst, only_hard_link=False):
+        # Fail placing the second file once, during the batch
+        if src == test_files[1] and (error := next(failures, None)):
+            raise error
+        return smartadd(src, dst, only_hard_link=only_hard_link)
+
+    with (
+        patch("fileindex.models.fileutils.smartadd", side_effect=flaky_smartadd),
+        patch("fileindex.services.file_import.should_import", return_value=True),
+    ):
+        stats = batch_import_files(test_files, batch_size=10)
+
+    assert stats["imported"] == 4
+    assert stats["created"] == 4
+    assert IndexedFile.objects.count() == 4
+
+
 def test_import_directory_nonexistent():
     """Test importing from non-existent directory."""
     stats = import_directory("/nonexistent/directory")
@@ -379,7 +535,7 @@ def test_find_importable_files_with_validation(temp_test_dir):
     """Test finding importable files with validation."""
     temp_dir, test_files = temp_test_dir
 
-    def mock_should_import(filepath):
+    def mock_should_import(filepath, entry=None):
         # Only accept .txt files with '0' in the name
         return filepath.endswith(".txt") and "0" in os.path.basename(filepath)
 
@@ -390,6 +546,18 @@ def test_find_importable_files_with_validation(temp_test_dir):
         assert "test0.txt" in files[0]
 
 
+def test_find_importable_files_validates_scanned_entries(tmp_path):
+    """Test that real validation works on the DirEntry objects from the scan."""
+    (tmp_path / "b.jpg").write_bytes(b"jpeg")
+    (tmp_path / "a.txt").write_text("text")
+    (tmp_path / "photos.jpg").mkdir()
+    (tmp_path / "photos.jpg" / "c.png").write_bytes(b"png")
+
+    files = find_importable_files(str(tmp_path), recursive=True)
+
+    assert files == [str(tmp_path / "b.jpg"), str(tmp_path / "photos.jpg" / "c.png")]
+
+
 @pytest.mark.django_db
 def test_import_file_with_symlink(temp_test_file):
     """After import with symlink=True, original path becomes a symlink to managed file."""
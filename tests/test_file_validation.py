@@ -0,0 +1,82 @@
+"""
+Tests for the file validation service.
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from fileindex.services import file_validation
+from fileindex.services.file_validation import should_import, should_import_filename
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        ("photo.jpg", True),
+        ("/home/user/Photo.JPEG", True),
+        ("clip.tar.mp4", True),
+        ("notes.txt", False),
+        ("jpg", False),
+        (".jpg", False),
+        ("/photos.jpg/readme", False),
+        ("../escape.png", False),
+        ("/ETC/passwd.png", False),
+        ("/proc/self/fd.gif", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_should_import_filename(filename, expected):
+    """Test the extension allow-list and path traversal checks."""
+    assert should_import_filename(filename) is expected
+
+
+def test_should_import_filename_follows_changes_to_the_lists(monkeypatch):
+    """Test that changes made to the public lists after import take effect."""
+    monkeypatch.setattr(file_validation, "ALLOWED_EXTENSIONS", file_validation.ALLOWED_EXTENSIONS | {".txt"})
+    monkeypatch.setattr(file_validation, "DISALLOWED_PATTERNS", [*file_validation.DISALLOWED_PATTERNS, "/private/"])
+
+    assert should_import_filename("notes.txt") is True
+    assert should_import_filename("/private/photo.jpg") is False
+
+    monkeypatch.setattr(file_validation, "DISALLOWED_PATTERNS", [])
+    assert should_import_filename("../escape.png") is True
+
+
+def test_should_import_checks_the_file_on_disk(tmp_path):
+    """Test that should_import only accepts existing regular files with an allowed name."""
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"jpeg")
+    (tmp_path / "folder.jpg").mkdir()
+
+    assert should_import(str(photo)) is True
+    assert should_import(photo) is True
+    assert should_import(str(tmp_path / "missing.jpg")) is False
+    assert should_import(str(tmp_path / "folder.jpg")) is False
+    assert should_import("") is False
+
+
+def test_should_import_skips_stat_for_rejected_names(tmp_path):
+    """Test that files with a disallowed extension are rejected without a stat() call."""
+    archive = tmp_path / "backup.iso"
+    archive.write_bytes(b"iso")
+
+    with patch("fileindex.services.file_validation.os.lstat") as mock_stat:
+        assert should_import(str(archive)) is False
+
+    mock_stat.assert_not_called()
+
+
+def test_should_import_rejects_symlinks(tmp_path):
+    """Test that symlinks aren't followed, whether checked by path or by DirEntry."""
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"jpeg")
+    (tmp_path / "link.jpg").symlink_to(photo)
+
+    assert should_import(str(tmp_path / "link.jpg")) is False
+
+    entries = {entry.name: entry for entry in os.scandir(tmp_path)}
+    assert should_import(entries["photo.jpg"].path, entry=entries["photo.jpg"]) is True
+    assert should_import(entries["link.jpg"].path, entry=entries["link.jpg"]) is False
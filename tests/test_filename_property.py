@@ -50,3 +50,23 @@ class IndexedFileFilenameTestCase(TestCase):
             # Clean up
             with contextlib.suppress(Exception):
                 Path(temp_path).unlink()
+
+    def test_filename_property_with_display_data(self):
+        """Test that filename reads prefetched FilePaths instead of querying."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write("Prefetched content")
+            temp_path = f.name
+
+        try:
+            created_file, _ = IndexedFile.objects.get_or_create_from_file(temp_path)
+
+            indexed_file = IndexedFile.objects.filter(pk=created_file.pk).with_display_data().get()
+
+            with self.assertNumQueries(0):
+                filename = indexed_file.filename
+
+            self.assertEqual(filename, Path(temp_path).name)
+
+        finally:
+            with contextlib.suppress(Exception):
+                Path(temp_path).unlink()
@@ -0,0 +1,92 @@
+"""
+Tests for placing files in storage with fileutils.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from fileindex import fileutils
+from fileindex.fileutils import get_mime_type, smartcopy, smartlink
+
+
+@pytest.fixture
+def racing_dst(monkeypatch):
+    """Make the first exists() check on a path miss it, as if another import placed it right after."""
+    exists = Path.exists
+    raced = set()
+
+    def racing_exists(self, *args, **kwargs):
+        if self.name == "dst" and self not in raced:
+            raced.add(self)
+            return False
+        return exists(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "exists", racing_exists)
+
+
+def test_smartcopy_copies_through_a_temporary_file(tmp_path):
+    """Test that smartcopy copies contents and metadata and leaves no temporary file."""
+    src = tmp_path / "src"
+    src.write_bytes(b"content")
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+    dst = tmp_path / "store" / "dst"
+
+    assert smartcopy(src, dst) is True
+
+    assert dst.read_bytes() == b"content"
+    assert dst.stat().st_mtime == 1_000_000_000
+    assert os.listdir(dst.parent) == ["dst"]
+
+
+def test_smartcopy_when_another_import_placed_dst_first(tmp_path, racing_dst):
+    """Test that losing the race to place identical content isn't an error and keeps dst."""
+    src = tmp_path / "src"
+    src.write_bytes(b"content")
+    dst = tmp_path / "dst"
+    dst.write_bytes(b"content")
+    dst_inode = dst.stat().st_ino
+
+    assert smartcopy(src, dst) is False
+
+    assert dst.stat().st_ino == dst_inode
+    assert sorted(os.listdir(tmp_path)) == ["dst", "src"]
+
+
+def test_smartlink_when_another_import_placed_dst_first(tmp_path, racing_dst):
+    """Test that losing the race to link identical content links src to the existing dst."""
+    src = tmp_path / "src"
+    src.write_bytes(b"content")
+    dst = tmp_path / "dst"
+    dst.write_bytes(b"content")
+
+    smartlink(src, dst)
+
+    assert src.samefile(dst)
+
+
+def test_smartcopy_falls_back_when_copy_file_range_copies_nothing(tmp_path, monkeypatch):
+    """Test that a file copy_file_range reports as empty is still copied by reading it."""
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0, raising=False)
+    src = tmp_path / "src"
+    src.write_bytes(b"content")
+    dst = tmp_path / "store" / "dst"
+
+    assert smartcopy(src, dst) is True
+
+    assert dst.read_bytes() == b"content"
+
+
+def test_get_mime_type_of_an_empty_file_does_not_depend_on_python_magic(tmp_path, monkeypatch):
+    """Test that an empty file gets the same MIME type from its header, libmagic and `file`."""
+    if not os.path.exists(fileutils.FILE_MIME_TYPE_COMMAND[0]):
+        pytest.skip("the file command is not installed")
+    empty = tmp_path / "empty"
+    empty.touch()
+
+    from_header = get_mime_type(empty, header=b"")
+    from_file = get_mime_type(empty)
+    monkeypatch.setattr(fileutils, "magic", None)
+
+    assert from_header == from_file == get_mime_type(empty) == "inode/x-empty"
@@ -2,13 +2,17 @@
 Tests for hash progress callback functionality.
 """
 
+import base64
+import hashlib
+import os
 import tempfile
+import threading
 from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
 
-from fileindex.fileutils import analyze_file, hash_file
+from fileindex.fileutils import analyze_file, hash_file, prefetch_file
 from fileindex.models import IndexedFile
 from fileindex.services.file_import import import_file
 
@@ -59,6 +63,52 @@ def test_hash_file_with_progress_callback():
         Path(temp_path).unlink()
 
 
+@pytest.mark.django_db
+def test_hash_file_matches_hashlib_across_chunks():
+    """Test that hashing through the reused read buffer matches a one-shot digest."""
+    # Not a multiple of the chunk size, so the last read is a partial buffer
+    content = bytes(range(256)) * 1000 + b"tail"
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        temp_file.write(content)
+        temp_file.flush()
+        temp_path = temp_file.name
+
+    try:
+        result = hash_file(temp_path, chunk_size=8192)
+
+        assert result["sha1"] == base64.b32encode(hashlib.sha1(content).digest()).decode("ascii").rstrip("=")
+        assert result["sha512"] == base64.b32encode(hashlib.sha512(content).digest()).decode("ascii").rstrip("=")
+
+    finally:
+        Path(temp_path).unlink()
+
+
+@pytest.mark.django_db
+def test_hash_file_tolerates_truncation_while_hashing():
+    """Test that a file truncated while it is being hashed ends early instead of crashing."""
+    content = bytes(range(256)) * 1000
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        temp_file.write(content)
+        temp_file.flush()
+        temp_path = temp_file.name
+
+    try:
+        progress_calls = []
+
+        def truncate_after_first_chunk(done, total):
+            progress_calls.append((done, total))
+            if len(progress_calls) == 1:
+                os.truncate(temp_path, 8192)
+
+        hashes = hash_file(temp_path, progress_callback=truncate_after_first_chunk, chunk_size=4096)
+
+        assert set(hashes) == {"sha1", "sha512"}
+        assert progress_calls[-1] == (8192, len(content))
+
+    finally:
+        Path(temp_path).unlink()
+
+
 @pytest.mark.django_db
 def test_hash_file_without_progress_callback():
     """Test that hash_file works without progress callback."""
@@ -99,7 +149,7 @@ def test_analyze_file_with_progress_callback():
         assert "sha1" in result
         assert "sha512" in result
         assert "mime_type" in result
-        assert "size" in result
+        assert result["size"] == len(b"Test content for analysis")
 
         # Verify progress callback was called
         assert progress_callback.called
@@ -108,6 +158,54 @@ def test_analyze_file_with_progress_callback():
         Path(temp_path).unlink()
 
 
+def test_analyze_file_uses_known_mime_type(tmp_path, monkeypatch):
+    """Test that analyze_file doesn't sniff the MIME type when it is passed in."""
+    temp_path = tmp_path / "known.txt"
+    temp_path.write_bytes(b"Test content for analysis")
+    get_mime_type = Mock()
+    monkeypatch.setattr("fileindex.fileutils.get_mime_type", get_mime_type)
+
+    result = analyze_file(temp_path, mime_type="text/plain")
+
+    assert result["mime_type"] == "text/plain"
+    assert result["size"] == len(b"Test content for analysis")
+    get_mime_type.assert_not_called()
+
+
+def test_analyze_file_reports_mime_type_before_hashing_finishes(tmp_path, monkeypatch):
+    """Test that the MIME type is sniffed from the first chunk and reported right away."""
+    temp_path = tmp_path / "large.bin"
+    temp_path.write_bytes(b"x" * (3 * 1024 * 1024))
+    get_mime_type = Mock(return_value="application/octet-stream")
+    monkeypatch.setattr("fileindex.fileutils.get_mime_type", get_mime_type)
+    progress = []
+
+    def mime_type_callback(mime_type):
+        assert mime_type == "application/octet-stream"
+        # Nothing has been reported as hashed yet
+        assert progress == []
+
+    callback = Mock(side_effect=mime_type_callback)
+    result = analyze_file(
+        temp_path, hash_progress_callback=lambda done, total: progress.append(done), mime_type_callback=callback
+    )
+
+    callback.assert_called_once_with("application/octet-stream")
+    assert result["mime_type"] == "application/octet-stream"
+    # Sniffed from the chunk the hasher read, not by opening the file again
+    assert len(get_mime_type.call_args.kwargs["header"]) == 1024 * 1024
+
+
+def test_prefetch_file_is_best_effort(tmp_path):
+    """Test that prefetching never fails, whether or not the file exists."""
+    existing = tmp_path / "existing.bin"
+    existing.write_bytes(b"x" * 1024)
+
+    prefetch_file(existing)
+    prefetch_file(tmp_path / "missing.bin")
+    prefetch_file(tmp_path)
+
+
 @pytest.mark.django_db
 def test_indexed_file_create_with_progress_callback():
     """Test IndexedFile.objects.get_or_create_from_file with progress callback."""
@@ -264,3 +362,34 @@ def test_progress_callback_values_accuracy():
 
     finally:
         Path(temp_path).unlink()
+
+
+@pytest.mark.django_db
+def test_cancelled_hashing_does_not_wait_for_metadata(monkeypatch):
+    """Test that cancelling from the progress callback doesn't wait for metadata extraction."""
+    release = threading.Event()
+    extraction_finished = threading.Event()
+
+    def slow_extract_metadata(*args, **kwargs):
+        release.wait(5)
+        extraction_finished.set()
+        return {}, False
+
+    monkeypatch.setattr("fileindex.services.metadata.extract_metadata", slow_extract_metadata)
+
+    def cancel(bytes_processed, total_bytes):
+        raise ValueError("Cancelled")
+
+    with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+        temp_file.write(b"Test content")
+        temp_path = temp_file.name
+
+    try:
+        with pytest.raises(ValueError):
+            IndexedFile.objects.get_or_create_from_file(temp_path, hash_progress_callback=cancel)
+
+        assert not extraction_finished.is_set()
+        assert IndexedFile.objects.count() == 0
+    finally:
+        release.set()
+        Path(temp_path).unlink()
@@ -84,7 +84,7 @@ class TestMetadataExtraction:
         assert metadata["video"]["width"] == 1920
         assert metadata["video"]["height"] == 1080
         assert metadata["duration"] == 60000
-        mock_extract.assert_called_once_with("/fake/video.mp4")
+        mock_extract.assert_called_once_with("/fake/video.mp4", stat=None)
 
     @patch("fileindex.services.media_metadata.extract_audio_metadata")
     def test_extract_metadata_audio(self, mock_extract):
@@ -103,7 +103,7 @@ class TestMetadataExtraction:
         assert "audio" in metadata
         assert metadata["audio"]["codec"] == "mp3"
         assert metadata["duration"] == 180000
-        mock_extract.assert_called_once_with("/fake/audio.mp3")
+        mock_extract.assert_called_once_with("/fake/audio.mp3", stat=None)
 
     def test_extract_metadata_unknown_type(self):
         """Test that extract_metadata handles unknown file types."""
@@ -135,3 +135,38 @@ class TestMetadataExtraction:
         # Should mark as corrupt when exception occurs
         assert is_corrupt
         assert metadata == {}
+
+    def test_index_streams_keeps_first_stream_of_each_type(self):
+        """Test that _index_streams maps each codec type to its first stream."""
+        from fileindex.services.media_metadata import _index_streams
+
+        data = {
+            "streams": [
+                {"index": 0, "codec_type": "video"},
+                {"index": 1, "codec_type": "audio"},
+                {"index": 2, "codec_type": "audio"},
+                {"index": 3},
+            ]
+        }
+
+        streams = _index_streams(data)
+
+        assert streams == {"video": {"index": 0, "codec_type": "video"}, "audio": {"index": 1, "codec_type": "audio"}}
+        assert _index_streams({}) == {}
+
+    @pytest.mark.parametrize(
+        "r_frame_rate,expected",
+        [
+            ("30000/1001", 30000 / 1001),
+            ("25/1", 25.0),
+            ("0/1", 0.0),
+            ("30/0", None),
+            ("30", None),
+            ("a/b", None),
+        ],
+    )
+    def test_parse_frame_rate(self, r_frame_rate, expected):
+        """Test parsing of ffprobe r_frame_rate strings."""
+        from fileindex.services.media_metadata import _parse_frame_rate
+
+        assert _parse_frame_rate(r_frame_rate) == expected
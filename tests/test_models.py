@@ -7,6 +7,7 @@ import pytest
 from django.utils import timezone
 
 from fileindex.factories import IndexedFileFactory
+from fileindex.fileutils import CannotHardLinkError
 from fileindex.models import FilePath, IndexedFile
 
 
@@ -263,3 +264,139 @@ def test_filepath_unique_constraint():
             ctime=timezone.now(),
             created_at=timezone.now(),
         )
+
+
+@pytest.mark.django_db
+def test_indexed_file_get_or_create_from_files():
+    """Test bulk indexing of several files, including a duplicate and an already indexed file."""
+    with (
+        tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as existing_tmp,
+        tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as new_tmp,
+        tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as duplicate_tmp,
+    ):
+        existing_tmp.write(b"already indexed content")
+        new_tmp.write(b"new bulk content")
+        duplicate_tmp.write(b"new bulk content")
+        for tmp in (existing_tmp, new_tmp, duplicate_tmp):
+            tmp.flush()
+
+        existing_file, _ = IndexedFile.objects.get_or_create_from_file(existing_tmp.name)
+
+        results = IndexedFile.objects.get_or_create_from_files([existing_tmp.name, new_tmp.name, duplicate_tmp.name])
+
+        assert results[0] == (existing_file, False)
+        assert results[1][1] is True
+        # Same content as the second file, so the same row, not created again
+        assert results[2] == (results[1][0], False)
+        assert IndexedFile.objects.count() == 2
+        assert FilePath.objects.filter(indexedfile=results[1][0]).count() == 2
+
+
+@pytest.mark.django_db
+def test_indexed_file_get_or_create_from_files_places_files_before_writing_rows():
+    """Test that a file that can't be placed leaves no rows behind."""
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as tmp:
+        tmp.write(b"content that can't be linked")
+        tmp.flush()
+
+        with (
+            patch("fileindex.models.fileutils.smartadd", side_effect=CannotHardLinkError("no")),
+            pytest.raises(CannotHardLinkError),
+        ):
+            IndexedFile.objects.get_or_create_from_files([tmp.name], only_hard_link=True)
+
+        assert IndexedFile.objects.count() == 0
+        assert FilePath.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_indexed_file_get_or_create_from_files_lost_insert_race():
+    """Test that a hash inserted by another importer mid-batch isn't reported as created."""
+    with (
+        tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as raced_tmp,
+        tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as new_tmp,
+    ):
+        raced_tmp.write(b"content another importer indexed first")
+        new_tmp.write(b"content only this batch has")
+        for tmp in (raced_tmp, new_tmp):
+            tmp.flush()
+
+        raced_file, _ = IndexedFile.objects.get_or_create_from_file(raced_tmp.name)
+
+        # The first lookup misses the row, as if it was inserted right after it
+        in_bulk = IndexedFile.objects.in_bulk
+        lookups = iter([lambda *args, **kwargs: {}])
+
+        def racing_in_bulk(*args, **kwargs):
+            return next(lookups, in_bulk)(*args, **kwargs)
+
+        with (
+            patch.object(IndexedFile.objects, "in_bulk", side_effect=racing_in_bulk),
+            patch("fileindex.models.indexedfile_added.send_robust", return_value=[]) as mock_send,
+        ):
+            results = IndexedFile.objects.get_or_create_from_files([raced_tmp.name, new_tmp.name])
+
+        assert results[0] == (raced_file, False)
+        assert results[1][1] is True
+        mock_send.assert_called_once_with(sender=IndexedFile, instance=results[1][0])
+        assert IndexedFile.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_indexed_file_get_or_create_from_files_moves_rows_from_an_older_layout():
+    """Test that bulk indexing fixes up file names from an older storage layout like single files do."""
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as tmp:
+        tmp.write(b"content indexed under an older layout")
+        tmp.flush()
+
+        indexed_file, _ = IndexedFile.objects.get_or_create_from_file(tmp.name)
+        IndexedFile.objects.filter(pk=indexed_file.pk).update(file="old/layout/file")
+
+        [(result, created)] = IndexedFile.objects.get_or_create_from_files([tmp.name])
+
+        assert created is False
+        assert result.file.name == IndexedFile.storage_path_for(indexed_file.sha512)
+        indexed_file.refresh_from_db()
+        assert indexed_file.file.name == IndexedFile.storage_path_for(indexed_file.sha512)
+
+
+@pytest.mark.django_db
+def test_indexed_file_get_or_create_from_files_signals_every_file_when_a_receiver_raises():
+    """Test that a failing indexedfile_added receiver doesn't stop the rest of the batch being signalled."""
+    from fileindex.models import indexedfile_added
+
+    signalled = []
+
+    def failing_receiver(sender, instance, **kwargs):
+        signalled.append(instance)
+        raise RuntimeError("receiver failed")
+
+    indexedfile_added.connect(failing_receiver)
+    try:
+        with (
+            tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as first_tmp,
+            tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as second_tmp,
+        ):
+            first_tmp.write(b"first signalled content")
+            second_tmp.write(b"second signalled content")
+            for tmp in (first_tmp, second_tmp):
+                tmp.flush()
+
+            results = IndexedFile.objects.get_or_create_from_files([first_tmp.name, second_tmp.name])
+    finally:
+        indexedfile_added.disconnect(failing_receiver)
+
+    assert [created for _indexed_file, created in results] == [True, True]
+    assert signalled == [indexed_file for indexed_file, _created in results]
+
+
+@pytest.mark.django_db
+def test_indexed_file_path_recomputed_after_refresh_from_db():
+    """Test that the cached storage path follows sha512 across refresh_from_db()."""
+    indexed_file = IndexedFileFactory(sha512="AB" * 64)
+    assert indexed_file.path == f"fileindex/AB/AB/{'AB' * 64}"
+
+    IndexedFile.objects.filter(pk=indexed_file.pk).update(sha512="CD" * 64)
+    indexed_file.refresh_from_db()
+
+    assert indexed_file.path == f"fileindex/CD/CD/{'CD' * 64}"
@@ -1,10 +1,15 @@
 """Test subprocess timeout handling in fileindex media analysis service."""
 
+import os
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from django.test import TestCase
 
+from fileindex import fileutils
 from fileindex.services import ffprobe, thumbnails
 from fileindex.services import metadata as metadata_service
 
@@ -109,6 +114,20 @@ class SubprocessTimeoutTestCase(TestCase):
         self.assertEqual(call_kwargs["timeout"], 30)
         self.assertEqual(thumbnail_path, "/tmp/test.jpg")
 
+    @patch("subprocess.run")
+    def test_generate_thumbnail_bytes_uses_pipe(self, mock_run):
+        """Test that the thumbnail is read from ffmpeg's stdout rather than a temp file."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b"\xff\xd8jpeg")
+
+        thumbnail = thumbnails.generate_video_thumbnail_bytes("/path/to/test.mp4")
+
+        self.assertEqual(thumbnail, b"\xff\xd8jpeg")
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[-5:], ["-f", "image2pipe", "-vcodec", "mjpeg", "-"])
+        # -ss before -i seeks the input rather than decoding up to the seek time
+        self.assertEqual(cmd[1:5], ["-ss", "00:00:00.5", "-i", "/path/to/test.mp4"])
+        self.assertEqual(mock_run.call_args[1]["timeout"], 30)
+
     @patch("subprocess.run")
     def test_get_ffprobe_version(self, mock_run):
         """Test ffprobe version extraction."""
@@ -119,7 +138,10 @@ class SubprocessTimeoutTestCase(TestCase):
         mock_run.return_value = mock_result
 
         # Clear the cached version first
-        ffprobe._ffprobe_version = None
+        ffprobe.get_ffprobe_version.cache_clear()
+        self.addCleanup(ffprobe.get_ffprobe_version.cache_clear)
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
 
         # Get version
         version = ffprobe.get_ffprobe_version()
@@ -140,7 +162,10 @@ class SubprocessTimeoutTestCase(TestCase):
         mock_run.return_value = mock_result
 
         # Clear cache
-        ffprobe._ffprobe_version = None
+        ffprobe.get_ffprobe_version.cache_clear()
+        self.addCleanup(ffprobe.get_ffprobe_version.cache_clear)
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
 
         # First call should invoke subprocess
         version1 = ffprobe.get_cached_ffprobe_version()
@@ -152,6 +177,20 @@ class SubprocessTimeoutTestCase(TestCase):
         self.assertEqual(version2, "5.1.2")
         self.assertEqual(mock_run.call_count, 1)  # Still 1, not called again
 
+    @patch("subprocess.run")
+    def test_missing_ffprobe_version_is_cached(self, mock_run):
+        """Test that a failed version check isn't retried on every call."""
+        mock_run.side_effect = FileNotFoundError
+
+        ffprobe.get_ffprobe_version.cache_clear()
+        self.addCleanup(ffprobe.get_ffprobe_version.cache_clear)
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+
+        self.assertIsNone(ffprobe.get_cached_ffprobe_version())
+        self.assertIsNone(ffprobe.get_cached_ffprobe_version())
+        self.assertEqual(mock_run.call_count, 1)
+
     @patch("subprocess.run")
     def test_subprocess_timeout_error_handling(self, mock_run):
         """Test that subprocess.TimeoutExpired is handled properly."""
@@ -172,7 +211,7 @@ class SubprocessTimeoutTestCase(TestCase):
         # Mock subprocess.run to simulate ffprobe failure
         mock_result = MagicMock()
         mock_result.returncode = 1
-        mock_result.stderr = "ffprobe error"
+        mock_result.stderr = b"ffprobe error"
         mock_run.return_value = mock_result
 
         # Should mark file as corrupt when ffprobe fails
@@ -187,7 +226,7 @@ class SubprocessTimeoutTestCase(TestCase):
         # Mock subprocess.run to simulate ffprobe failure
         mock_result = MagicMock()
         mock_result.returncode = 1
-        mock_result.stderr = "ffprobe error"
+        mock_result.stderr = b"ffprobe error"
         mock_run.return_value = mock_result
 
         # Should mark file as corrupt when ffprobe fails
@@ -196,3 +235,154 @@ class SubprocessTimeoutTestCase(TestCase):
         # Should return corrupt flag when ffprobe fails
         self.assertTrue(is_corrupt)
         mock_run.assert_called_once()
+
+    @patch("fileindex.fileutils.magic", None)
+    @patch("subprocess.run")
+    def test_get_mime_type_without_libmagic(self, mock_run):
+        """Test that get_mime_type falls back to the file command with a timeout."""
+        mock_result = MagicMock()
+        mock_result.returncode = 0
+        mock_result.stdout = "image/jpeg\n"
+        mock_run.return_value = mock_result
+
+        self.assertEqual(fileutils.get_mime_type("/path/to/test.jpg"), "image/jpeg")
+
+        call_kwargs = mock_run.call_args[1]
+        self.assertEqual(call_kwargs["timeout"], 10)
+
+    @patch("fileindex.fileutils._get_magic")
+    @patch("subprocess.run")
+    def test_get_mime_type_with_libmagic(self, mock_run, mock_get_magic):
+        """Test that get_mime_type uses libmagic in-process when it is installed."""
+        if fileutils.magic is None:
+            self.skipTest("python-magic is not installed")
+        mock_get_magic.return_value.from_file.return_value = "image/png"
+
+        self.assertEqual(fileutils.get_mime_type("/path/to/test.png"), "image/png")
+
+        mock_get_magic.return_value.from_file.assert_called_once_with("/path/to/test.png")
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_run_ffprobe_is_cached_until_the_file_changes(self, mock_run):
+        """Test that probing an unchanged file again doesn't spawn ffprobe."""
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        mock_run.return_value = MagicMock(returncode=0, stdout='{"format": {"duration": "5.0"}}')
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
+            first = ffprobe.run_ffprobe(tmp.name)
+            first["format"]["duration"] = "changed"
+            second = ffprobe.run_ffprobe(tmp.name)
+            self.assertEqual(mock_run.call_count, 1)
+            self.assertEqual(second, {"format": {"duration": "5.0"}})
+
+            tmp.write(b"more data")
+            tmp.flush()
+            ffprobe.run_ffprobe(tmp.name)
+            self.assertEqual(mock_run.call_count, 2)
+
+    @patch("subprocess.run")
+    def test_run_ffprobe_probes_a_file_replaced_with_the_same_size_and_mtime(self, mock_run):
+        """Test that a file replaced by rename isn't given the old file's cached output."""
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        mock_run.return_value = MagicMock(returncode=0, stdout='{"format": {"duration": "5.0"}}')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "video.mp4")
+            replacement = os.path.join(tmpdir, "replacement.mp4")
+            for name, data in ((path, b"old!"), (replacement, b"new!")):
+                with open(name, "wb") as f:
+                    f.write(data)
+                os.utime(name, ns=(1_000_000_000, 1_000_000_000))
+
+            ffprobe.run_ffprobe(path)
+            os.replace(replacement, path)
+            ffprobe.run_ffprobe(path)
+
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch("subprocess.run")
+    def test_run_ffprobe_uses_callers_stat(self, mock_run):
+        """Test that a stat result from the caller keys the cache without another stat()."""
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        mock_run.return_value = MagicMock(returncode=0, stdout='{"format": {"duration": "5.0"}}')
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
+            stat = os.stat(tmp.name)
+            with patch("fileindex.services.ffprobe.os.stat") as mock_stat:
+                ffprobe.run_ffprobe(tmp.name, stat=stat)
+                ffprobe.run_ffprobe(tmp.name, stat=stat)
+
+        mock_stat.assert_not_called()
+        self.assertEqual(mock_run.call_count, 1)
+
+    @patch("subprocess.run")
+    def test_concurrent_run_ffprobe_probes_once(self, mock_run):
+        """Test that threads probing the same file share one ffprobe run."""
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_ffprobe(cmd, **kwargs):
+            started.set()
+            release.wait(5)
+            return MagicMock(returncode=0, stdout='{"format": {"duration": "5.0"}}')
+
+        mock_run.side_effect = slow_ffprobe
+
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                first = executor.submit(ffprobe.run_ffprobe, tmp.name)
+                started.wait(5)
+                second = executor.submit(ffprobe.run_ffprobe, tmp.name)
+                release.set()
+                results = [first.result(), second.result()]
+
+        self.assertEqual(results, [{"format": {"duration": "5.0"}}] * 2)
+        self.assertEqual(mock_run.call_count, 1)
+
+    @patch("subprocess.run")
+    def test_concurrent_run_ffprobe_of_different_files_runs_in_parallel(self, mock_run):
+        """Test that probing one file doesn't hold up probes of other files."""
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        # Only passes if both probes are running at the same time
+        both_running = threading.Barrier(2, timeout=5)
+
+        def ffprobe_waiting_for_the_other(cmd, **kwargs):
+            both_running.wait()
+            return MagicMock(returncode=0, stdout='{"format": {"duration": "5.0"}}')
+
+        mock_run.side_effect = ffprobe_waiting_for_the_other
+
+        with (
+            tempfile.NamedTemporaryFile(suffix=".mp4") as first,
+            tempfile.NamedTemporaryFile(suffix=".mp4") as second,
+        ):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(ffprobe.run_ffprobe, [first.name, second.name]))
+
+        self.assertEqual(results, [{"format": {"duration": "5.0"}}] * 2)
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch("subprocess.run")
+    def test_run_ffprobe_records_program_version(self, mock_run):
+        """Test that the version comes from the probe itself, not a separate ffprobe -version."""
+        ffprobe.get_ffprobe_version.cache_clear()
+        self.addCleanup(ffprobe.get_ffprobe_version.cache_clear)
+        ffprobe.clear_ffprobe_cache()
+        self.addCleanup(ffprobe.clear_ffprobe_cache)
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout='{"program_version": {"version": "6.1.1"}, "format": {"duration": "5.0"}}'
+        )
+
+        result = ffprobe.run_ffprobe("/path/to/test.mp4")
+
+        self.assertEqual(result, {"format": {"duration": "5.0"}})
+        self.assertIn("-show_program_version", mock_run.call_args[0][0])
+        self.assertEqual(ffprobe.get_cached_ffprobe_version(), "6.1.1")
+        self.assertEqual(mock_run.call_count, 1)
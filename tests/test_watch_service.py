@@ -1,7 +1,10 @@
 """Tests for the directory watch service."""
 
+import threading
 from unittest.mock import Mock, patch
 
+from watchdog.observers.polling import PollingObserver
+
 from fileindex.services.watch import DirectoryWatcher, WatchEventHandler
 
 # WatchEventHandler tests
@@ -330,7 +333,7 @@ def test_handle_file_event_with_delete_after(mock_import_file):
     )
 
 
-@patch("fileindex.services.watch.PollingObserver")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
 def test_start_watching(mock_observer_class):
     """Test starting the directory watcher."""
     mock_observer = Mock()
@@ -355,7 +358,7 @@ def test_start_watching(mock_observer_class):
     assert observer == mock_observer
 
 
-@patch("fileindex.services.watch.PollingObserver")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
 def test_start_watching_already_running(mock_observer_class):
     """Test starting watcher when already running."""
     mock_observer = Mock()
@@ -374,6 +377,59 @@ def test_start_watching_already_running(mock_observer_class):
     assert observer == mock_observer
 
 
+@patch("fileindex.services.watch.import_file")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
+def test_file_events_are_imported_off_the_observer_thread(mock_observer_class, mock_import_file):
+    """Test that file events are handed to the worker pool instead of blocking the observer."""
+    import_threads = []
+
+    def record_import(filepath, **kwargs):
+        import_threads.append(threading.current_thread().name)
+        return Mock(), True, None
+
+    mock_import_file.side_effect = record_import
+    mock_observer = Mock()
+    mock_observer.is_alive.return_value = True
+    mock_observer_class.return_value = mock_observer
+
+    watcher = DirectoryWatcher(paths=["/path1"])
+    watcher.start_watching()
+
+    # Deliver an event through the handler the observer was given
+    event_handler = mock_observer.schedule.call_args[0][0]
+    event_handler.callback("/path1/new.jpg")
+
+    # Stopping waits for queued imports to finish
+    watcher.stop_watching()
+
+    mock_import_file.assert_called_once_with("/path1/new.jpg", delete_after=False, validate=True)
+    assert import_threads[0].startswith("fileindex-watch")
+
+
+@patch("fileindex.services.watch.import_file")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
+def test_stop_watching_closes_worker_connections(mock_observer_class, mock_import_file):
+    """Test that each import worker's database connection is closed once watching stops."""
+    mock_import_file.return_value = (Mock(), True, None)
+    mock_observer = Mock()
+    mock_observer.is_alive.return_value = True
+    mock_observer_class.return_value = mock_observer
+    mock_connection = Mock()
+
+    with patch("fileindex.services.file_import.connections", {"default": mock_connection}):
+        watcher = DirectoryWatcher(paths=["/path1"], max_workers=1)
+        watcher.start_watching()
+        event_handler = mock_observer.schedule.call_args[0][0]
+        event_handler.callback("/path1/a.jpg")
+        event_handler.callback("/path1/b.jpg")
+        watcher.stop_watching()
+
+    # One worker thread imported both files over the same connection
+    mock_connection.inc_thread_sharing.assert_called_once()
+    mock_connection.close.assert_called_once()
+    mock_connection.dec_thread_sharing.assert_called_once()
+
+
 def test_stop_watching():
     """Test stopping the directory watcher."""
     mock_observer = Mock()
@@ -413,16 +469,19 @@ def test_stop_watching_no_observer():
     watcher.stop_watching()
 
 
-@patch("fileindex.services.watch.PollingObserver")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
 def test_watch_and_wait(mock_observer_class):
     """Test watch_and_wait convenience method."""
     mock_observer = Mock()
-    # is_alive called in start_watching, watch_and_wait loop, and stop_watching
-    mock_observer.is_alive.side_effect = [False, True, False, False]
+    # is_alive is only checked by stop_watching once the wait ends
+    mock_observer.is_alive.return_value = True
     mock_observer_class.return_value = mock_observer
 
     watcher = DirectoryWatcher(paths=["/path1"])
 
+    # Simulate another thread asking the watcher to stop once it is running
+    mock_observer.start.side_effect = watcher._stop_requested.set
+
     # Watch and wait
     watcher.watch_and_wait()
 
@@ -437,18 +496,22 @@ def test_watch_and_wait(mock_observer_class):
 
 
 def test_watch_and_wait_stops_gracefully():
-    """Test that watch_and_wait stops the observer gracefully when loop ends."""
+    """Test that watch_and_wait stops the observer gracefully when a stop is requested."""
     mock_observer = Mock()
-    # Simulate observer becoming not alive after one iteration
-    mock_observer.is_alive.side_effect = [False, True, False, False]
+    mock_observer.is_alive.side_effect = [True, False]
 
     watcher = DirectoryWatcher(paths=["/path1"])
     watcher.observer = mock_observer
 
+    def start_watching():
+        # Stop is requested right after the watcher starts
+        watcher._stop_requested.set()
+        return mock_observer
+
     # Override start_watching to not create a new observer
-    watcher.start_watching = Mock(return_value=mock_observer)
+    watcher.start_watching = Mock(side_effect=start_watching)
 
-    # Watch and wait - should exit when is_alive returns False
+    # Watch and wait - should exit once the stop request is seen
     watcher.watch_and_wait()
 
     # Should have joined the observer at least once
@@ -458,7 +521,38 @@ def test_watch_and_wait_stops_gracefully():
     mock_observer.stop.assert_called_once()
 
 
-@patch("fileindex.services.watch.PollingObserver")
+@patch("fileindex.services.watch._NotifyingPollingObserver")
+def test_watch_and_wait_honours_earlier_stop_request(mock_observer_class):
+    """Test that a stop requested before watch_and_wait starts isn't lost."""
+    mock_observer = Mock()
+    mock_observer.is_alive.return_value = True
+    mock_observer_class.return_value = mock_observer
+
+    watcher = DirectoryWatcher(paths=["/path1"])
+    watcher._stop_requested.set()
+
+    # Returns instead of blocking forever
+    watcher.watch_and_wait()
+
+    mock_observer.stop.assert_called_once()
+    # Handled, so the watcher can be started again
+    assert not watcher._stop_requested.is_set()
+
+
+def test_watch_and_wait_returns_when_observer_dies(tmp_path):
+    """Test that watch_and_wait doesn't wait forever on an observer thread that died."""
+    watcher = DirectoryWatcher(paths=[str(tmp_path)])
+
+    # The observer thread ends straight away without being asked to stop
+    with patch.object(PollingObserver, "run"), patch("fileindex.services.watch.logger") as mock_logger:
+        watcher.watch_and_wait()
+
+    mock_logger.warning.assert_any_call("Observer thread stopped unexpectedly")
+    assert not watcher.observer.is_alive()
+    assert not watcher._stop_requested.is_set()
+
+
+@patch("fileindex.services.watch._NotifyingPollingObserver")
 def test_watch_and_wait_multiple_paths(mock_observer_class):
     """Test watch_and_wait with multiple paths."""
     mock_observer = Mock()